@@ -0,0 +1,109 @@
+"""
+Compares the per call cost of Request against the AbstractMethod, Channel
+and Response objects it replaced, for one eth_blockNumber round trip from
+building the call to its typed result. Run from the repository root:
+
+    python benchmarks/bench_request.py
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api import Eth
+from src.structs import Structs
+from src.types import Types
+
+import asyncio as aio
+from secrets import token_hex
+import timeit
+import tracemalloc
+
+
+class LegacyChannel(object):
+    __slots__=["_event","_request","_response","_exception"]
+
+    def __init__(self,request):
+        self._event = aio.Event()
+        self._request = request
+        self._response = None
+        self._exception = None
+
+    def set_response(self,response):
+        self._response = response
+        self._event.set()
+
+
+class LegacyAbstractMethod(object):
+    __slots__=["_method","_params","_result","_exception","_complete","_id","_set_result"]
+
+    def __init__(self, set_result_function, method, params):
+        self._set_result = set_result_function
+        self._method = method
+        self._params = params or []
+        self._result = None
+        self._exception = None
+        self._complete = False
+        self._id = token_hex(32)
+
+    def set_exception(self, exception):
+        self._exception = exception
+
+    def set_response(self,response):
+        response = Structs.response(response)
+        if response.error:
+            self.set_exception(response.error)
+        else:
+            self._set_result(self, response.result)
+
+    def as_dict(self):
+        return {"jsonrpc":"2.0","method":self._method,"id":self._id,"params":self._params}
+
+
+def legacy_blockNumber():
+    def set_result(self, result):
+        try:
+            self._result = Types.uint256(result)
+        except Exception as e:
+            self.set_exception(e)
+        finally:
+            self._complete = True
+    return LegacyAbstractMethod(set_result, "eth_blockNumber", None)
+
+
+def legacy_call():
+    abm = legacy_blockNumber()
+    msg = abm.as_dict()
+    channel = LegacyChannel(msg)
+    channel.set_response({"jsonrpc":"2.0","id":msg["id"],"result":"0x10"})
+    abm.set_response(channel._response)
+    return abm, channel
+
+
+def request_call():
+    request = Eth.blockNumber()
+    msg = request.request
+    request.set_response({"jsonrpc":"2.0","id":msg["id"],"result":"0x10"})
+    request.resolve(request._future.result())
+    return request
+
+
+def bench(name, fn, number):
+    seconds = min(timeit.repeat(fn, number=number, repeat=5))
+    print('{:<28}{:>10.2f} us/call'.format(name, seconds / number * 1e6))
+
+
+def memory(name, fn, number):
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+    kept = [fn() for _ in range(number)]
+    stats = tracemalloc.take_snapshot().compare_to(start, 'filename')
+    tracemalloc.stop()
+    print('{:<28}{:>10.0f} bytes/call'.format(name, sum(stat.size_diff for stat in stats) / number))
+
+
+if __name__ == '__main__':
+    aio.set_event_loop(aio.new_event_loop())
+    bench('legacy round trip', legacy_call, 20000)
+    bench('Request round trip', request_call, 20000)
+    memory('legacy retained', legacy_call, 5000)
+    memory('Request retained', request_call, 5000)
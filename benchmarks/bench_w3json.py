@@ -0,0 +1,66 @@
+"""
+Compares the w3json codecs against the exception driven encoder w3json
+used before codecs were added. Run from the repository root:
+
+    python benchmarks/bench_w3json.py
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.types import Types
+from src.w3json import (CODECS, codec)
+
+import json
+from json import JSONEncoder
+from secrets import token_hex
+import timeit
+
+
+class LegacyStructEncoder(JSONEncoder):
+        def default(self, o):
+            try:
+                return o.as_dict()
+            except:
+                return str(o)
+
+class legacy(object):
+
+    @staticmethod
+    def dumps(obj):
+        return json.dumps(obj,cls=LegacyStructEncoder)
+
+    @staticmethod
+    def loads(obj):
+        return json.loads(obj)
+
+
+def requests(n):
+    thash = Types.bytes32('0x'+'ab'*32)
+    return [{"jsonrpc":"2.0","method":"eth_getTransactionReceipt","id":token_hex(32),"params":[thash]} for _ in range(n)]
+
+
+def block(n):
+    transaction = {
+        "hash":'0x'+'ab'*32, "nonce":'0x1', "blockHash":'0x'+'cd'*32, "blockNumber":'0x10',
+        "transactionIndex":'0x0', "from":'0x'+'11'*20, "to":'0x'+'22'*20, "value":'0x0',
+        "gas":'0x5208', "gasPrice":'0x3b9aca00', "input":'0x'+'00'*68,
+    }
+    return json.dumps({"jsonrpc":"2.0","id":token_hex(32),"result":{"transactions":[transaction]*n}})
+
+
+def bench(name, fn, number):
+    seconds = min(timeit.repeat(fn, number=number, repeat=5))
+    print('{:<28}{:>10.1f} us/op'.format(name, seconds / number * 1e6))
+
+
+if __name__ == '__main__':
+    frame = requests(300)
+    payload = block(300)
+    bench('legacy dumps', lambda: legacy.dumps(frame), 20)
+    for name, encoder in sorted(CODECS.items()):
+        bench('{} dumps'.format(name), lambda: encoder.dumps(frame), 20)
+    bench('legacy loads', lambda: legacy.loads(payload), 20)
+    for name, encoder in sorted(CODECS.items()):
+        bench('{} loads'.format(name), lambda: encoder.loads(payload), 20)
+    print('default codec: {}'.format(codec().__name__))
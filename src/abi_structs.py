@@ -19,7 +19,8 @@ log = logging.getLogger(__name__)
 class ABIContract(object):
     __slots__=["_functions","_events","_constructor","_fallback","_functions_by_selector","_events_by_topic","_bytecode","_address"]
 
-    def __init__(self, abi):
+    def __init__(self, abi, address=None):
+        self._address = address
         functions = [ABIFunction(f) for f in abi if f["type"] == "function"]
         events = [ABIEvent(f) for f in abi if f["type"] == "event"]
         """if bytecode:
@@ -1,266 +1,215 @@
+from .request import Request
+from .requestqueue import (HIGHPRIORITY, LOWPRIORITY)
+from .solidity_types import Bytes32
 from .structs import Structs
 from .types import Types
 
-from secrets import token_hex
 import logging
 
 
 log = logging.getLogger(__name__)
 
 
+"""
+These are the methods that only read chain state.
+"""
+READ_ONLY_METHODS = [
+    'eth_syncing',
+    'eth_coinbase',
+    'eth_gasPrice',
+    'eth_accounts',
+    'eth_blockNumber',
+    'eth_getBalance',
+    'eth_getBlockByHash',
+    'eth_getBlockByNumber',
+    'eth_getTransactionByHash',
+    'eth_getTransactionReceipt',
+    'eth_call',
+    'eth_getLogs',
+    'eth_getBlockReceipts',
+    'parity_getBlockReceipts',
+    'eth_getTransactionCount',
+    'eth_chainId',
+    'eth_estimateGas',
+]
+
+
+"""
+These are the methods that may be resent after a lost connection. Anything
+not listed here, like sendRawTransaction, fails fast instead of being replayed.
+"""
+IDEMPOTENT_METHODS = READ_ONLY_METHODS
+
+
+"""
+Converts the raw result of each method to its type. Methods without a
+parser, like eth_call, return the raw result.
+"""
+PARSERS = {
+    'eth_syncing': lambda result: Structs.syncing(result) if result else False,
+    'eth_coinbase': Types.address,
+    'eth_gasPrice': Types.uint256,
+    'eth_accounts': lambda result: [Types.address(acct) for acct in result],
+    'eth_blockNumber': Types.uint256,
+    'eth_getBalance': Types.uint256,
+    'eth_getBlockByHash': Structs.block,
+    'eth_getBlockByNumber': Structs.block,
+    'eth_getTransactionByHash': Structs.transaction,
+    'eth_getTransactionReceipt': Structs.transactionReceipt,
+    'eth_sendRawTransaction': Types.bytes32,
+    'eth_call': None,
+    'eth_getTransactionCount': Types.uint256,
+    'eth_chainId': Types.uint256,
+    'eth_estimateGas': Types.uint256,
+    'eth_getLogs': lambda result: [Structs.log(l) for l in result],
+    'eth_getBlockReceipts': lambda result: [Structs.transactionReceipt(r) for r in result],
+    'parity_getBlockReceipts': lambda result: [Structs.transactionReceipt(r) for r in result],
+    'personal_sendTransaction': Types.bytes32,
+}
+
+
+def request(method, params, priority=HIGHPRIORITY):
+    return Request(PARSERS[method], method, params, priority, method in IDEMPOTENT_METHODS)
+
+
 class Eth(object):
     __slots__=[]
 
     #works
     @staticmethod
     def syncing():
-        method = "eth_syncing"
-        params = None
-        def set_result(self, result):
-            try:
-                if result:
-                    self._result = Structs.syncing(result)
-                else:
-                    self._result = False
-            except Exception as e:
-                self.set_exception(e)
-            finally:
-                self._complete = True
-        return AbstractMethod(set_result, method, params)
+        return request("eth_syncing", None)
 
     #works
     @staticmethod
     def coinbase():
-        method = "eth_coinbase"
-        params = None
-        def set_result(self, result):
-            try:
-                self._result = Types.address(result)
-            except Exception as e:
-                self.set_exception(e)
-            finally:
-                self._complete = True
-        return AbstractMethod(set_result, method, params)
+        return request("eth_coinbase", None)
 
     #works
     @staticmethod
     def gasPrice():
-        method = "eth_gasPrice"
-        params = None
-        def set_result(self, result):
-            try:
-                self._result = Types.uint256(result)
-            except Exception as e:
-                self.set_exception(e)
-            finally:
-                self._complete = True
-        return AbstractMethod(set_result, method, params)
+        return request("eth_gasPrice", None)
 
     #works
     @staticmethod
     def accounts():
-        method = "eth_accounts"
-        params = None
-        def set_result(self, result):
-            try:
-                self._result = [Types.address(acct) for acct in result]
-            except Exception as e:
-                self._exception = e
-            finally:
-                self._complete = True
-        return AbstractMethod(set_result, method, params)
+        return request("eth_accounts", None)
 
     #works
     @staticmethod
     def blockNumber():
-        method = "eth_blockNumber"
-        params = None
-        def set_result(self, result):
-            try:
-                self._result = Types.uint256(result)
-            except Exception as e:
-                self.set_exception(e)
-            finally:
-                self._complete = True
-        return AbstractMethod(set_result, method, params)
+        return request("eth_blockNumber", None)
 
     #works
     @staticmethod
     def getBalance(account, block_identifier="latest"):
-        method = "eth_getBalance"
         Types.addressCheck(account)
         if block_identifier != 'latest':
             Types.bytes32Check(block_identifier)
-        params = [account,block_identifier]
-        def set_result(self, result):
-            try:
-                self._result = Types.uint256(result)
-            except Exception as e:
-                self.set_exception(e)
-            finally:
-                self._complete = True
-        return AbstractMethod(set_result, method, params)
+        return request("eth_getBalance", [account,block_identifier])
+
+    @staticmethod
+    def getTransactionCount(account, block_identifier="pending"):
+        Types.addressCheck(account)
+        return request("eth_getTransactionCount", [account,block_identifier])
+
+    @staticmethod
+    def chainId():
+        return request("eth_chainId", None)
+
+    @staticmethod
+    def estimateGas(to=None, frm=None, data=None, value=0, gas=None):
+        transaction = Structs.transactionObject(to,frm,data,value,gas)
+        return request("eth_estimateGas", [transaction.as_dict()])
 
     #works
     @staticmethod
-    def getBlockByHash(block_hash):#, full_transactions=False):
-        full_transactions=False #TODO parse full trahsactions
-        method = "eth_getBlockByHash"
+    def getBlockByHash(block_hash, full_transactions=False):
         Types.bytes32Check(block_hash)
         assert type(full_transactions) is bool, 'full_transactions must be of type bool'
-        params = [block_hash,full_transactions]
-        def set_result(self, result):
-            try:
-                self._result = Structs.block(result)
-            except Exception as e:
-                self.set_exception(e)
-            finally:
-                self._complete = True
-        return AbstractMethod(set_result, method, params)
+        return request("eth_getBlockByHash", [block_hash,full_transactions], LOWPRIORITY)
 
     #works
     @staticmethod
-    def getBlockByNumber(block_number):# full_transactions=False):
-        full_transactions=False #TODO parse full trahsactions
-        method = "eth_getBlockByNumber"
+    def getBlockByNumber(block_number, full_transactions=False):
         Types.uint256Check(block_number)
         assert type(full_transactions) is bool, 'full_transactions must be of type bool'
-        params = [block_number,full_transactions]
-        def set_result(self, result):
-            try:
-                self._result = Structs.block(result)
-            except Exception as e:
-                self.set_exception(e)
-            finally:
-                self._complete = True
-        return AbstractMethod(set_result, method, params)
+        return request("eth_getBlockByNumber", [block_number,full_transactions], LOWPRIORITY)
 
     #works
     @staticmethod
     def getTransactionByHash(transaction_hash):
-        method = "eth_getTransactionByHash"
         Types.bytes32Check(transaction_hash)
-        params = [transaction_hash]
-        def set_result(self, result):
-            try:
-                self._result = Structs.transaction(result)
-            except Exception as e:
-                self.set_exception(e)
-            finally:
-                self._complete = True
-        return AbstractMethod(set_result, method, params)
+        return request("eth_getTransactionByHash", [transaction_hash], LOWPRIORITY)
 
     #works
     @staticmethod
     def getTransactionReceipt(transaction_hash):
-        method = "eth_getTransactionReceipt"
         Types.bytes32Check(transaction_hash)
-        params = [transaction_hash]
-        def set_result(self, result):
-            try:
-                self._result = Structs.transactionReceipt(result)
-            except Exception as e:
-                self.set_exception(e)
-            finally:
-                self._complete = True
-        return AbstractMethod(set_result, method, params)
+        return request("eth_getTransactionReceipt", [transaction_hash], LOWPRIORITY)
+
+    @staticmethod
+    def getBlockReceipts(block):
+        """
+        block is a block number or, to be safe across reorgs, a block hash.
+        """
+        if not isinstance(block, Bytes32):
+            Types.uint256Check(block)
+        return request("eth_getBlockReceipts", [block], LOWPRIORITY)
+
+    @staticmethod
+    def getLogs(fromBlock=None, toBlock=None, address=None, topics=None, blockHash=None):
+        """
+        address is one address or a list of them, topics a list where each
+        position holds a topic, a list of alternatives or None for any.
+        """
+        params = {}
+        if blockHash is not None:
+            Types.bytes32Check(blockHash)
+            params["blockHash"] = blockHash
+        else:
+            for name, block in (("fromBlock",fromBlock),("toBlock",toBlock)):
+                if block is not None:
+                    if not isinstance(block, str):
+                        Types.uint256Check(block)
+                    params[name] = block
+        if address is not None:
+            params["address"] = address
+        if topics is not None:
+            params["topics"] = topics
+        return request("eth_getLogs", [params], LOWPRIORITY)
 
     @staticmethod
     def sendRawTransaction(raw_transaction):
-        method = "eth_sendRawTransaction"
-        params = [raw_transaction]
-        def set_result(self, result):
-            try:
-                self._result = Types.bytes32(result)
-            except Exception as e:
-                self.set_exception(e)
-            finally:
-                self._complete = True
-        return AbstractMethod(set_result, method, params)
+        return request("eth_sendRawTransaction", [raw_transaction])
 
     #works
     @staticmethod
     def call(to=None, frm=None, data=None, value=0, gas=None, block_identifier='latest'):
-        method = "eth_call"
         assert to, 'MUST DEFINE TO'
         transaction = Structs.transactionObject(to,frm,data,value,gas)
-        params = [transaction.as_dict(), block_identifier]
-        def set_result(self, result):
-            try:
-                self._result = result
-            except Exception as e:
-                self.set_exception(e)
-            finally:
-                self._complete = True
-        return AbstractMethod(set_result, method, params)
+        return request("eth_call", [transaction.as_dict(), block_identifier])
 
 
-class Personal(object):
+class Parity(object):
     __slots__=[]
 
     @staticmethod
-    def sendTransaction(to, frm, password, data=None, value=None, gas=None):
-        method = "personal_sendTransaction"
-        transaction = Structs.transactionObject(to,frm,data,value, gas)
-        params = [transaction.as_dict(), password]
-        def set_result(self, result):
-            try:
-                self._result = Types.bytes32(result)
-            except Exception as e:
-                self.set_exception(e)
-            finally:
-                self._complete = True
-        return AbstractMethod(set_result, method, params)
-
-
-class AbstractMethod(object):
-    __slots__=["_method","_params","_result","_exception","_complete","_id","_set_result"]
-
-    def __init__(self, set_result_function, method, params):
-        self._set_result = set_result_function
-        self._method = method
-        self._params = params or []
-        self._result = None
-        self._exception = None
-        self._complete = False
-        self._id = token_hex(32)
-
-    def set_exception(self, exception):
-        self._exception = exception
-
-    def set_result(self, result):
-        self._set_result(self, result)
-
-    def set_response(self,response):
-        #log.debug('AbstractMethod got response as {}'.format(response))
-        response = Structs.response(response)
-        if response.error:
-            self.set_exception(response.error)
-        else:
-            self.set_result(response.result)
-
-    @property
-    def method(self):
-        return self._method
-
-    @property
-    def params(self):
-        return self._params
+    def getBlockReceipts(block):
+        """
+        block is a block number or, to be safe across reorgs, a block hash,
+        which parity only takes wrapped as {"blockHash": hash}.
+        """
+        if isinstance(block, Bytes32):
+            return request("parity_getBlockReceipts", [{"blockHash":block}], LOWPRIORITY)
+        Types.uint256Check(block)
+        return request("parity_getBlockReceipts", [block], LOWPRIORITY)
 
-    @property
-    def id(self):
-        return self._id
 
-    @property
-    def complete(self):
-        return self._complete
-
-    @property
-    def result(self):
-        if self._exception:
-            raise self._exception
-        else:
-            return self._result
+class Personal(object):
+    __slots__=[]
 
-    def as_dict(self):
-        return {"jsonrpc":"2.0","method":self._method,"id":self._id,"params":self._params}
+    @staticmethod
+    def sendTransaction(to, frm, password, data=None, value=None, gas=None):
+        transaction = Structs.transactionObject(to,frm,data,value, gas)
+        return request("personal_sendTransaction", [transaction.as_dict(), password])
@@ -0,0 +1,99 @@
+from .exceptions import MulticallFailed
+from .hextools import ( add0x,
+                        bytes_to_hex,
+                        hex_to_bytes,
+                        trim0x, )
+
+import asyncio as aio
+import eth_abi
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+"""
+Selector of tryAggregate(bool,(address,bytes)[]), on Multicall2 and Multicall3.
+"""
+TRY_AGGREGATE = '0xbce38bd7'
+
+
+class BulkCall(object):
+    """
+    Calls one constant contract function on many addresses. Calldata is
+    encoded once per distinct argument set, and the calls go out in
+    JSON-RPC batches of batch_size, at most concurrency at a time. With
+    a multicall address each chunk is instead a single eth_call to
+    tryAggregate on that contract. Results come back in input order,
+    with the exception in place of any call that failed.
+    """
+    __slots__ = ["_eth","_batch","_function","_concurrency","_batch_size","_block_identifier","_multicall"]
+
+    def __init__(self, eth, batch, function, concurrency=8, batch_size=100, block_identifier='latest', multicall=None):
+        self._eth = eth
+        self._batch = batch
+        self._function = function
+        self._concurrency = concurrency
+        self._batch_size = batch_size
+        self._block_identifier = block_identifier
+        self._multicall = multicall
+
+    def _encode(self, addresses, args):
+        """
+        Pairs each address with its calldata. args is one tuple of
+        arguments for every address, or a list with a tuple per address.
+        """
+        if isinstance(args, list):
+            assert len(args) == len(addresses), 'args must hold one tuple per address'
+        else:
+            args = [args] * len(addresses)
+        calldata = {}
+        calls = []
+        for address, arguments in zip(addresses, args):
+            key = repr(arguments)
+            if key not in calldata:
+                calldata[key] = self._function.encode(list(arguments))
+            calls.append((address, calldata[key]))
+        return calls
+
+    def _decode(self, data):
+        try:
+            return self._function.decode(data)
+        except Exception as e:
+            return e
+
+    async def _send_batch(self, chunk):
+        batch = self._batch()
+        requests = [batch.eth.call(to=to,data=data,block_identifier=self._block_identifier) for to, data in chunk]
+        await batch.send()
+        results = []
+        for request in requests:
+            try:
+                results.append(self._decode(request.result))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def _send_multicall(self, chunk):
+        payload = eth_abi.encode_abi(['bool','(address,bytes)[]'],
+                                     [False, [(to.as_str(), hex_to_bytes(data)) for to, data in chunk]])
+        data = add0x(trim0x(TRY_AGGREGATE) + bytes_to_hex(payload))
+        response = await self._eth.call(to=self._multicall,data=data,block_identifier=self._block_identifier)
+        returned = eth_abi.decode_abi(['(bool,bytes)[]'], hex_to_bytes(response))[0]
+        return [self._decode(add0x(bytes_to_hex(data))) if success else MulticallFailed(to)
+                for (success, data), (to, _) in zip(returned, chunk)]
+
+    async def run(self, addresses, args=()):
+        calls = self._encode(list(addresses), args)
+        send = self._send_multicall if self._multicall else self._send_batch
+        semaphore = aio.Semaphore(self._concurrency)
+        async def run_chunk(chunk):
+            async with semaphore:
+                try:
+                    return await send(chunk)
+                except Exception as e:
+                    log.debug("BulkCall chunk of {} failed with {}".format(len(chunk),repr(e)))
+                    return [e] * len(chunk)
+        chunks = [calls[i:i + self._batch_size] for i in range(0, len(calls), self._batch_size)]
+        results = await aio.gather(*[run_chunk(chunk) for chunk in chunks])
+        return [result for chunk in results for result in chunk]
@@ -0,0 +1,117 @@
+from collections import OrderedDict
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+"""
+These are the methods whose parsed results never change once the block
+they belong to is confirmed, mapped to how the block number is read off
+the result.
+"""
+CACHEABLE_METHODS = {
+    'eth_getBlockByHash':lambda block: block.number,
+    'eth_getBlockByNumber':lambda block: block.number,
+    'eth_getTransactionByHash':lambda transaction: transaction.blockNumber,
+    'eth_getTransactionReceipt':lambda receipt: receipt.blockNumber,
+}
+
+
+class ResponseCache(object):
+    """
+    A size bounded LRU of parsed results for immutable chain data. A result
+    is only stored once its block is at least confirmations deep below the
+    highest eth_blockNumber seen, so data that a reorg could still change is
+    never cached. An optional store, like a DiskCache, is a second tier
+    holding the raw results under the in memory one.
+    """
+    __slots__ = ["_maxsize","_confirmations","_store","_entries","_head","_hits","_misses","_evictions"]
+
+    def __init__(self, maxsize=10000, confirmations=12, store=None):
+        self._maxsize = maxsize
+        self._confirmations = confirmations
+        self._store = store
+        self._entries = OrderedDict()
+        self._head = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def covers(self, abstract_method):
+        return abstract_method.method in CACHEABLE_METHODS
+
+    def get(self, abstract_method):
+        """
+        Returns (True, result) on a hit and (False, None) on a miss.
+        """
+        key = abstract_method.key
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return True, self._entries[key]
+        if self._store:
+            raw = self._store.get(key)
+            if raw is not None:
+                try:
+                    abstract_method.set_result(raw)
+                    result = abstract_method.result
+                except Exception as e:
+                    log.error('ResponseCache could not parse stored {} with {}'.format(key[0],repr(e)))
+                else:
+                    self.put(key, result)
+                    self._hits += 1
+                    return True, result
+        self._misses += 1
+        return False, None
+
+    def observe(self, abstract_method, result, response=None):
+        """
+        Tracks the chain head from eth_blockNumber results and stores
+        cacheable results that are deep enough, along with the raw result
+        from response in the store.
+        """
+        method = abstract_method.method
+        if method == 'eth_blockNumber':
+            self.set_head(result)
+        elif method in CACHEABLE_METHODS:
+            block_number = CACHEABLE_METHODS[method](result)
+            if self.confirmed(block_number):
+                self.put(abstract_method.key, result)
+                if self._store and response is not None:
+                    self._store.put(abstract_method.key, block_number.as_int(), response["result"])
+
+    def set_head(self, block_number):
+        block_number = int(block_number.as_int() if hasattr(block_number,"as_int") else block_number)
+        if self._head is None or block_number > self._head:
+            self._head = block_number
+
+    def confirmed(self, block_number):
+        if self._head is None or block_number is None:
+            return False
+        return self._head - block_number.as_int() >= self._confirmations
+
+    def put(self, key, result):
+        if self._maxsize <= 0:
+            return
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self._hits + self._misses
+        return {
+            "size":len(self._entries),
+            "maxsize":self._maxsize,
+            "head":self._head,
+            "hits":self._hits,
+            "misses":self._misses,
+            "hit_rate":self._hits / lookups if lookups else 0.0,
+            "evictions":self._evictions,
+            "store":self._store.stats() if self._store else None,
+        }
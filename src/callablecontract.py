@@ -1,4 +1,6 @@
 from .abi_structs import ABIContract
+from .bulkcall import BulkCall
+from .snapshot import current_snapshot
 
 import asyncio as aio
 import logging
@@ -8,18 +10,28 @@ log = logging.getLogger(__name__)
 
 
 class CallableContract(object):
-    __slots__=["_functions_by_selector","_functions_by_name","_eth","_personal"]
+    __slots__=["_functions_by_selector","_functions_by_name","_eth","_personal","_address","_batch"]
 
-    def __init__(self,eth,personal,contract):
+    def __init__(self,eth,personal,contract,batch=None):
         self._functions_by_selector = contract.functions_by_selector
         self._functions_by_name = contract.functions
         self._eth = eth
         self._personal = personal
+        self._address = contract.address
+        self._batch = batch
 
     @property
     def functions(self):
         return self._functions_by_name
 
+    @property
+    def address(self):
+        return self._address
+
+    @property
+    def batch(self):
+        return self._batch
+
     def f(self, name):
         #if self._functions_by_name.get(name,None) is not None:
         return CallableFunction(self._eth, self._personal, self, name)
@@ -44,27 +56,50 @@ class CallableFunction(object):
         function = self._contract.functions[self._name]
         log.debug(args)
         calldata = function.encode(args)
-        return EncodedCall(self._eth, self._personal, function, calldata)
+        return EncodedCall(self._eth, self._personal, function, calldata, self._contract.address)
+
+    async def call_many(self, addresses, args=(), **kwargs):
+        """
+        Calls the function on every address, with args shared by all or
+        one tuple of args per address. kwargs are passed to BulkCall.
+        """
+        function = self._contract.functions[self._name]
+        return await BulkCall(self._eth, self._contract.batch, function, **kwargs).run(addresses, args)
 
 
 class EncodedCall(object):
-    __slots__ = ["_function","_calldata","_eth","_personal"]
+    __slots__ = ["_function","_calldata","_eth","_personal","_to"]
 
-    def __init__(self, eth, personal, function, calldata):
+    def __init__(self, eth, personal, function, calldata, to=None):
         self._function = function
         self._calldata = calldata
         self._eth = eth
         self._personal = personal
+        self._to = to
 
     async def call(self, **kwargs):
         kwargs = dict(kwargs)
+        if self._to is not None:
+            kwargs.setdefault("to",self._to)
         if self._calldata != '0x':
             kwargs.update({"data":self._calldata})
-        response = await self._eth.call(**kwargs)
+        snapshot = current_snapshot()
+        if snapshot is not None and "block_identifier" not in kwargs:
+            response = await snapshot.call(**kwargs)
+        else:
+            response = await self._eth.call(**kwargs)
         return self._function.decode(response)
 
-    async def transact(self,**kwargs):
+    async def transact(self,sender=None,**kwargs):
+        """
+        With a TransactionSender the transaction is signed locally and sent
+        raw, otherwise it goes through personal_sendTransaction.
+        """
         kwargs = dict(kwargs)
+        if self._to is not None:
+            kwargs.setdefault("to",self._to)
         kwargs.update({"data":self._calldata})
+        if sender is not None:
+            return await sender.send(**kwargs)
         response = await self._personal.sendTransaction(**kwargs)
         return response
@@ -0,0 +1,133 @@
+import asyncio as aio
+import json
+import logging
+import sqlite3
+
+
+log = logging.getLogger(__name__)
+
+
+class DiskCache(object):
+    """
+    A SQLite backed store of raw JSONRPC results for immutable chain data,
+    used as the tier under ResponseCache. The database runs in WAL mode so
+    several processes and W3AIO instances can share one file. Once the
+    stored results grow past max_bytes the oldest are evicted.
+
+    Lookups run on the event loop, so timeout, the wait for a lock held by
+    another process, is kept short. A read that hits a locked database is
+    a miss and a write is skipped.
+    """
+    __slots__ = ["_path","_max_bytes","_db","_size","_puts","_hits","_misses","_evictions","_busy"]
+
+    CHECK_EVERY = 256
+
+    def __init__(self, path, max_bytes=2**30, timeout=0.05):
+        self._path = path
+        self._max_bytes = max_bytes
+        self._db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS results ('
+                         'method TEXT NOT NULL, params TEXT NOT NULL, block INTEGER NOT NULL, '
+                         'result TEXT NOT NULL, size INTEGER NOT NULL, PRIMARY KEY (method, params))')
+        self._db.execute('CREATE INDEX IF NOT EXISTS results_block ON results (block)')
+        self._size = self._stored_bytes()
+        self._puts = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._busy = 0
+
+    def _failed(self, action, exception):
+        if isinstance(exception, sqlite3.OperationalError) and 'locked' in str(exception):
+            self._busy += 1
+            log.debug('DiskCache {} skipped, database locked'.format(action))
+        else:
+            log.error('DiskCache {} failed with {}'.format(action,repr(exception)))
+
+    def _stored_bytes(self):
+        return self._db.execute('SELECT COALESCE(SUM(size),0) FROM results').fetchone()[0]
+
+    def get(self, key):
+        try:
+            row = self._db.execute('SELECT result FROM results WHERE method=? AND params=?', key).fetchone()
+        except sqlite3.Error as e:
+            self._failed('read', e)
+            row = None
+        if row is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, block_number, result):
+        result = json.dumps(result, separators=(',',':'))
+        try:
+            self._db.execute('INSERT OR REPLACE INTO results (method, params, block, result, size) VALUES (?,?,?,?,?)',
+                             (key[0], key[1], block_number, result, len(result)))
+        except sqlite3.Error as e:
+            self._failed('write', e)
+            return
+        self._size += len(result)
+        self._puts += 1
+        if self._puts % self.CHECK_EVERY == 0:
+            #other processes write to the same file, so recount now and then
+            self._size = self._stored_bytes()
+        if self._size > self._max_bytes:
+            self.evict()
+
+    def evict(self, max_bytes=None):
+        """
+        Deletes the oldest results until the store is under max_bytes,
+        by default 90% of the configured limit.
+        """
+        target = int(self._max_bytes * 0.9) if max_bytes is None else max_bytes
+        try:
+            self._size = self._stored_bytes()
+            while self._size > target:
+                rows = self._db.execute('SELECT rowid, size FROM results ORDER BY rowid LIMIT 1000').fetchall()
+                if not rows:
+                    break
+                freed, last = 0, rows[-1][0]
+                for rowid, size in rows:
+                    freed += size
+                    if self._size - freed <= target:
+                        last = rowid
+                        break
+                deleted = self._db.execute('DELETE FROM results WHERE rowid <= ?', (last,)).rowcount
+                self._evictions += deleted
+                self._size = self._stored_bytes()
+        except sqlite3.Error as e:
+            self._failed('eviction', e)
+
+    def _vacuum(self, timeout):
+        db = sqlite3.connect(self._path, timeout=timeout, isolation_level=None)
+        try:
+            db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            db.execute('VACUUM')
+        finally:
+            db.close()
+
+    async def compact(self, timeout=30):
+        """
+        Evicts down to the size limit and returns free pages to the file
+        system. The rewrite runs on its own connection in a thread, waiting
+        up to timeout for other writers, so the event loop is not held up.
+        """
+        self.evict(self._max_bytes)
+        await aio.get_event_loop().run_in_executor(None, self._vacuum, timeout)
+
+    def close(self):
+        self._db.close()
+
+    def stats(self):
+        return {
+            "path":self._path,
+            "bytes":self._size,
+            "max_bytes":self._max_bytes,
+            "hits":self._hits,
+            "misses":self._misses,
+            "evictions":self._evictions,
+            "busy":self._busy,
+        }
@@ -12,9 +12,20 @@ class JsonRPCError(Exception):
     JSONRPC response error
     """
     def __init__(self, error):
+        super().__init__(error.code, error.message)
         self.code = error.code
         self.message = error.message
 
+class MulticallFailed(Exception):
+    """
+    This error is returned in place of the result of a call that reverted inside a multicall.
+    """
+
+class MissingResponse(Exception):
+    """
+    This error is raised if a JSONRPC batch response has no entry for a request.
+    """
+
 class BadLength(Exception):
     """
     This error is raised of a type encoding fails due to data length.
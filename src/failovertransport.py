@@ -0,0 +1,151 @@
+from .multitransport import MultiTransport
+from .request import Request
+from .requestqueue import HIGHPRIORITY
+
+import asyncio as aio
+from collections import deque
+import logging
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+class FailoverTransport(MultiTransport):
+    """
+    Spreads calls over transports to different nodes. Idempotent calls go to
+    the healthiest member, fail over to the next one on error and, with hedge
+    set, are duplicated to a second member once they run past the hedge
+    percentile of recent latencies. Other calls go to exactly one member.
+    With health_interval set, members a HealthMonitor scores low, such as
+    nodes lagging the best head, are ranked last.
+    """
+    __slots__ = ["_latency","_failed_at","_outstanding","_samples","_hedge","_percentile",
+                 "_min_delay","_cooldown","_delay","_since_delay","_hedges","_hedge_wins","_failovers"]
+
+    EWMA = 0.2
+    NAME = "Failover"
+
+    def __init__(self, transports, hedge=False, percentile=0.95, min_delay=0.02, window=256, cooldown=5.0,
+                 health_interval=None, max_lag=2, loop=None):
+        super().__init__(transports, health_interval, max_lag, loop)
+        self._latency = [0.0 for _ in self._members]
+        self._failed_at = [None for _ in self._members]
+        self._outstanding = [0 for _ in self._members]
+        self._samples = deque(maxlen=window)
+        self._hedge = hedge
+        self._percentile = percentile
+        self._min_delay = min_delay
+        self._cooldown = cooldown
+        self._delay = None
+        self._since_delay = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._failovers = 0
+
+    def _failing(self, index):
+        failed_at = self._failed_at[index]
+        return failed_at is not None and time.monotonic() - failed_at < self._cooldown
+
+    def _rank(self):
+        score = self._health.score if self._health else lambda i: 1.0
+        return sorted(range(len(self._members)), key=lambda i: (not self._members[i].ready, score(i) <= 0.0,
+                                                                 self._failing(i), self._latency[i], self._outstanding[i]))
+
+    def _hedge_delay(self):
+        if not self._samples:
+            return None
+        if self._delay is None or self._since_delay >= self._samples.maxlen // 8:
+            ordered = sorted(self._samples)
+            self._delay = max(self._min_delay, ordered[min(len(ordered) - 1, int(len(ordered) * self._percentile))])
+            self._since_delay = 0
+        return self._delay
+
+    async def _attempt(self, index, msg, priority, timeout, retries, idempotent):
+        self._outstanding[index] += 1
+        start = time.monotonic()
+        try:
+            response = await self._members[index].call(msg,priority,timeout,retries,idempotent)
+        except aio.CancelledError:
+            raise
+        except Exception:
+            self._failed_at[index] = time.monotonic()
+            if self._health:
+                self._health.record(index,False)
+            raise
+        finally:
+            self._outstanding[index] -= 1
+        elapsed = time.monotonic() - start
+        self._latency[index] = elapsed if not self._latency[index] else \
+            self._latency[index] + self.EWMA * (elapsed - self._latency[index])
+        self._failed_at[index] = None
+        if self._health:
+            self._health.record(index,True)
+        self._samples.append(elapsed)
+        self._since_delay += 1
+        return response
+
+    async def _hedged(self, order, tried, msg, priority, timeout, retries):
+        primary = aio.ensure_future(self._attempt(order[0],msg,priority,timeout,retries,True))
+        tried.append(order[0])
+        delay = self._hedge_delay()
+        if len(order) < 2 or delay is None:
+            return await primary
+        done, pending = await aio.wait([primary],timeout=delay)
+        if done:
+            return primary.result()
+        log.debug("Hedging call to member {} after {:.3f}s".format(order[1],delay))
+        self._hedges += 1
+        secondary = aio.ensure_future(self._attempt(order[1],msg,priority,timeout,retries,True))
+        tried.append(order[1])
+        try:
+            error = None
+            for future in aio.as_completed([primary, secondary]):
+                try:
+                    response = await future
+                except aio.CancelledError:
+                    raise
+                except Exception as e:
+                    error = e
+                    continue
+                if not (primary.done() and not primary.cancelled() and primary.exception() is None):
+                    self._hedge_wins += 1
+                return response
+            raise error
+        finally:
+            primary.cancel()
+            secondary.cancel()
+
+    async def call(self, msg, priority=HIGHPRIORITY, timeout=None, retries=None, idempotent=True):
+        if isinstance(msg, Request):
+            #a request is resolved once, so each member attempt gets its own frame
+            msg = msg.request
+        order = self._rank()
+        if not idempotent:
+            return await self._attempt(order[0],msg,priority,timeout,retries,False)
+        tried = []
+        while True:
+            try:
+                if self._hedge:
+                    return await self._hedged(order,tried,msg,priority,timeout,retries)
+                tried.append(order[0])
+                return await self._attempt(order[0],msg,priority,timeout,retries,True)
+            except aio.CancelledError:
+                raise
+            except Exception as e:
+                order = [index for index in order if index not in tried]
+                if not order:
+                    raise
+                log.warning("Failing over to member {} after {}".format(order[0],repr(e)))
+                self._failovers += 1
+
+    def endpoint_stats(self):
+        return {
+            "latency":list(self._latency),
+            "failing":[self._failing(index) for index in range(len(self._members))],
+            "outstanding":list(self._outstanding),
+            "hedge_delay":self._delay,
+            "hedged":self._hedges,
+            "hedge_wins":self._hedge_wins,
+            "failovers":self._failovers,
+        }
@@ -1,3 +1,4 @@
+from .exceptions import JsonRPCError
 from .structs import Structs
 
 import asyncio as aio
@@ -8,12 +9,30 @@ import logging
 log = logging.getLogger(__name__)
 
 
-class Filter(object):
-    __slots__ = ["_eth","_eventAbis","_eventFilters","_thashFilters","_addressFilters","loop"]
+"""
+JSONRPC error code of a method the node does not have.
+"""
+METHOD_NOT_FOUND = -32601
+
 
-    def __init__(self, eth, loop=None):
+class Filter(object):
+    """
+    Runs the registered filters over each block. With block_receipts set
+    the receipts of a block are fetched by its hash in one
+    eth_getBlockReceipts, or parity_getBlockReceipts, call. A method the
+    node reports as not found is dropped for good. On any other error the
+    receipts of that block are fetched one transaction at a time.
+    """
+    __slots__ = ["_eth","_eventAbis","_eventFilters","_thashFilters","_addressFilters","_receipt_methods","loop"]
+
+    def __init__(self, eth, parity=None, block_receipts=True, loop=None):
         self.loop = loop or aio.get_event_loop()
         self._eth = eth
+        self._receipt_methods = []
+        if block_receipts:
+            self._receipt_methods.append(eth.getBlockReceipts)
+            if parity is not None:
+                self._receipt_methods.append(parity.getBlockReceipts)
         self._eventAbis = {}
         self._eventFilters = {}
         self._thashFilters = {}
@@ -73,10 +92,39 @@ class Filter(object):
             elif to_cback:
                 await to_cback(transaction.hash)
 
-    async def on_block(self, blocknumber):
-        block = await self._eth.getBlockByNumber(blocknumber)
-        receipts = await aio.gather(*[self._eth.getTransactionReceipt(thash) for thash in block.transactions])
+    def _unsupported(self, exception):
+        #only the method missing is permanent, "block not found" from a lagging node is not
+        return isinstance(exception, JsonRPCError) and exception.code == METHOD_NOT_FOUND
+
+    async def _receipts(self, block):
+        thashes = block.transactionHashes
+        for method in list(self._receipt_methods):
+            try:
+                receipts = await method(block.hash)
+            except Exception as e:
+                if self._unsupported(e):
+                    log.warning("Filter dropping unsupported block receipts method after {}".format(repr(e)))
+                    if method in self._receipt_methods:
+                        self._receipt_methods.remove(method)
+                    continue
+                log.debug("Filter block receipts failed with {}, fetching per transaction".format(repr(e)))
+                break
+            if len(receipts) == len(thashes):
+                return receipts
+            break
+        return await aio.gather(*[self._eth.getTransactionReceipt(thash) for thash in thashes])
+
+    async def fetch(self, blocknumber):
+        """
+        The block, with its transactions, and its receipts. on_block can
+        be handed these when they were fetched ahead of time.
+        """
+        block = await self._eth.getBlockByNumber(blocknumber, True)
+        receipts = await self._receipts(block)
+        return block, receipts
+
+    async def on_block(self, blocknumber, fetched=None):
+        block, receipts = fetched or await self.fetch(blocknumber)
         await self._handle_thash_filters(receipts)
         await self._handle_event_filters(receipts)
-        transactions = await aio.gather(*[self._eth.getTransactionByHash(thash) for thash in block.transactions])
-        await self._handle_address_filters(transactions)
+        await self._handle_address_filters(block.transactions)
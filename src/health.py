@@ -0,0 +1,118 @@
+from .requestqueue import HIGHPRIORITY
+
+import asyncio as aio
+from itertools import count
+import logging
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+class HealthMonitor(object):
+    """
+    Pings each transport with eth_blockNumber every interval seconds and
+    tracks its round trip time, error rate and how far its head trails the
+    best head seen. score is 0 for members that are down or more than
+    max_lag blocks behind, otherwise higher for faster, more reliable ones.
+    """
+    __slots__ = ["_transports","_interval","_timeout","_max_lag","_rtt","_errors","_heads","_head","_pings","_ids","_canary"]
+
+    EWMA = 0.2
+
+    def __init__(self, transports, interval=5.0, timeout=2.0, max_lag=2):
+        self._transports = transports
+        self._interval = interval
+        self._timeout = timeout
+        self._max_lag = max_lag
+        self._rtt = [None for _ in transports]
+        self._errors = [0.0 for _ in transports]
+        self._heads = [None for _ in transports]
+        self._head = None
+        self._pings = 0
+        self._ids = count()
+        self._canary = aio.Event()
+
+    async def run(self):
+        self._canary.clear()
+        while not self._canary.is_set():
+            await aio.gather(*[self._ping(index) for index in range(len(self._transports))])
+            self._pings += 1
+            try:
+                await aio.wait_for(self._canary.wait(),self._interval)
+            except aio.TimeoutError:
+                pass
+
+    async def _ping(self, index):
+        transport = self._transports[index]
+        if not transport.ready:
+            return
+        msg = {"jsonrpc":"2.0","id":"health-{}".format(next(self._ids)),"method":"eth_blockNumber","params":[]}
+        start = time.monotonic()
+        try:
+            response = await transport.call(msg,HIGHPRIORITY,self._timeout,0,True)
+            head = int(response["result"],16)
+        except aio.CancelledError:
+            raise
+        except Exception as e:
+            log.debug("Health ping to member {} failed with {}".format(index,repr(e)))
+            self.record(index,False)
+            return
+        rtt = time.monotonic() - start
+        self._rtt[index] = rtt if self._rtt[index] is None else self._rtt[index] + self.EWMA * (rtt - self._rtt[index])
+        self._heads[index] = head
+        self._head = head if self._head is None else max(self._head, head)
+        self.record(index,True)
+
+    def record(self, index, ok):
+        """
+        Folds the outcome of a ping or a call into the member's error rate.
+        """
+        self._errors[index] += self.EWMA * ((0.0 if ok else 1.0) - self._errors[index])
+
+    def lag(self, index):
+        if self._heads[index] is None or self._head is None:
+            return None
+        return self._head - self._heads[index]
+
+    def score(self, index):
+        if not self._transports[index].ready:
+            return 0.0
+        lag = self.lag(index)
+        if lag is None:
+            #not pinged yet, ranked below every member known to be healthy
+            return 0.01
+        if lag > self._max_lag:
+            return 0.0
+        return (1.0 - self._errors[index]) / (1.0 + lag) / (1.0 + (self._rtt[index] or 0.0))
+
+    @property
+    def head(self):
+        return self._head
+
+    @property
+    def safe_head(self):
+        """
+        The highest block every member still in rotation has reached.
+        """
+        heads = [self._heads[index] for index in range(len(self._transports))
+                 if self.score(index) > 0.0 and self._heads[index] is not None]
+        return min(heads) if heads else None
+
+    def stats(self):
+        return {
+            "head":self._head,
+            "safe_head":self.safe_head,
+            "pings":self._pings,
+            "members":[{
+                "rtt":self._rtt[index],
+                "error_rate":self._errors[index],
+                "head":self._heads[index],
+                "lag":self.lag(index),
+                "score":self.score(index),
+            } for index in range(len(self._transports))],
+        }
+
+    def close(self):
+        if not self._canary.is_set():
+            self._canary.set()
@@ -0,0 +1,139 @@
+from .requestqueue import BLOCK
+from .transport import (MessageError, Transport)
+
+import asyncio as aio
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+class HTTPError(Exception):
+    """
+    This Exception is raised for a non JSONRPC reply from an HTTP endpoint.
+    """
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+
+class HTTPTransport(Transport):
+    """
+    JSONRPC over HTTP/1.1. Each of the size workers holds one persistent
+    keep-alive connection and eats from the shared request queue.
+    """
+    __slots__ = ["_host","_port","_path","_size","_connections"]
+
+    def __init__(self, host, port, path='/', size=4, encoder=None, batch_window=None, max_batch_size=100,
+                 aging=2.0, timeout=None, retries=3, max_queue=0, overflow=BLOCK, rate_limiter=None, metrics=False, loop=None):
+        super().__init__(encoder=encoder, batch_window=batch_window, max_batch_size=max_batch_size, aging=aging,
+                         timeout=timeout, retries=retries, max_queue=max_queue, overflow=overflow, rate_limiter=rate_limiter, metrics=metrics, loop=loop)
+        self._host = host
+        self._port = port
+        self._path = path
+        self._size = size
+        self._connections = 0
+
+    async def run(self):
+        await self._race(*[self._worker(index) for index in range(self._size)])
+
+    async def _worker(self, index):
+        log.debug("HTTP worker {} running".format(index))
+        connection = None
+        opened = False
+        failures = 0
+        try:
+            while not self._canary.is_set():
+                channels = []
+                try:
+                    if connection is None:
+                        connection = await aio.wait_for(aio.open_connection(self._host,self._port),self.IO_TIMEOUT)
+                        self._connections += 1
+                        #each worker holds its own connection, only reopening one is a reconnect
+                        self._connected(opened)
+                        opened = True
+                    channel = await self._next()
+                    channels = [channel]
+                    channels = await self._gather_frame(channel)
+                    msg, channels = self._encode_frame(channels)
+                    if not channels:
+                        continue
+                    log.debug("HTTP worker {} sending message {}".format(index,msg))
+                    status, headers, body = await aio.wait_for(self._post(connection,msg,channels),self.IO_TIMEOUT)
+                    failures = 0
+                    if headers.get("connection","").lower() == "close":
+                        connection = self._close_connection(connection)
+                    try:
+                        msg = self._decode(body)
+                    except MessageError as e:
+                        if status != 200:
+                            raise HTTPError(status,body)
+                        raise e
+                    log.debug("HTTP worker {} decoded recv'd msg as {}".format(index,msg))
+                    self._dispatch_lockstep(msg, channels)
+                except (MessageError, HTTPError) as e:
+                    log.debug("HTTP {}".format(repr(e)))
+                    if isinstance(e, MessageError):
+                        self._message_error()
+                    for channel in channels:
+                        channel.set_exception(e)
+                except (Exception, aio.CancelledError) as e:
+                    for channel in channels:
+                        self._retry(channel, e)
+                    if isinstance(e, aio.CancelledError):
+                        raise e
+                    log.error("HTTP worker {} connection lost with {}. Reconnecting.".format(index,repr(e)))
+                    if connection is not None:
+                        connection = self._close_connection(connection)
+                    failures += 1
+                    await self._wait_backoff(failures)
+        finally:
+            if connection is not None:
+                self._close_connection(connection)
+
+    def _close_connection(self, connection):
+        reader, writer = connection
+        writer.close()
+        self._connections -= 1
+        if self._connections == 0:
+            self._ready.clear()
+
+    async def _post(self, connection, msg, channels=()):
+        reader, writer = connection
+        body = msg.encode('utf-8') if isinstance(msg, str) else msg
+        head = ('POST {} HTTP/1.1\r\n'
+                'Host: {}:{}\r\n'
+                'Content-Type: application/json\r\n'
+                'Content-Length: {}\r\n'
+                'Connection: keep-alive\r\n\r\n').format(self._path,self._host,self._port,len(body))
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+        self._trace_written(channels)
+        line = await reader.readline()
+        if not line:
+            raise ConnectionResetError('HTTP connection closed by peer')
+        status = int(line.split(b' ',2)[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding","").lower() == "chunked":
+            body = await self._read_chunked(reader)
+        else:
+            body = await reader.readexactly(int(headers.get("content-length",0)))
+        return status, headers, body
+
+    async def _read_chunked(self, reader):
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0],16)
+            if size == 0:
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        return b''.join(chunks)
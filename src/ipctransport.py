@@ -0,0 +1,106 @@
+from .requestqueue import BLOCK
+from .transport import (MessageError, Transport)
+
+import asyncio as aio
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+class IPCTransport(Transport):
+    """
+    JSONRPC over a local Unix socket. Requests are written newline framed and
+    replies are routed back to their Request by id, so many requests can be
+    outstanding on the one stream.
+    """
+    __slots__ = ["_path","_limit","_failures"]
+
+    def __init__(self, path, encoder=None, max_in_flight=100, batch_window=None, max_batch_size=100,
+                 aging=2.0, timeout=None, retries=3, max_queue=0, overflow=BLOCK, rate_limiter=None, metrics=False, limit=2**26, loop=None):
+        super().__init__(encoder=encoder, max_in_flight=max_in_flight, batch_window=batch_window,
+                         max_batch_size=max_batch_size, aging=aging, timeout=timeout, retries=retries,
+                         max_queue=max_queue, overflow=overflow, rate_limiter=rate_limiter, metrics=metrics, loop=loop)
+        self._path = path
+        self._limit = limit
+        self._failures = 0
+
+    async def run(self):
+        while not self._canary.is_set():
+            try:
+                await self._handle()
+                self._failures = 0
+            except Exception as e:
+                log.error("IPC connection lost with {}. Reconnecting.".format(repr(e)))
+                self._failures += 1
+            finally:
+                self._requeue_in_flight()
+            if not self._canary.is_set():
+                await self._wait_backoff(self._failures)
+
+    async def _handle(self):
+        log.debug("IPC connecting to {}".format(self._path))
+        reader, writer = await aio.open_unix_connection(self._path, limit=self._limit)
+        self._in_flight_sem = aio.Semaphore(self._max_in_flight)
+        self._connected()
+        #a connection that came up starts a fresh run of failures
+        self._failures = 0
+        try:
+            await self._race(self._writer(writer),self._reader(reader))
+        finally:
+            self._ready.clear()
+            writer.close()
+
+    async def _writer(self, writer):
+        while True:
+            await self._in_flight_sem.acquire()
+            msg, channels = await self._next_frame()
+            self._register_in_flight(channels)
+            if not channels:
+                continue
+            log.debug("IPC sending message {}".format(msg))
+            writer.write((msg.encode('utf-8') if isinstance(msg, str) else msg) + b'\n')
+            await writer.drain()
+            self._trace_written(channels)
+
+    def _resync(self, buffer, line):
+        """
+        A reply starting a new unindented line that parses on its own means
+        what was buffered before it was malformed. That is dropped and the
+        reply returned, otherwise None.
+        """
+        if len(buffer) == len(line) or line[:1] not in (b'{', b'['):
+            return None
+        try:
+            msg = self._decode(line)
+        except MessageError:
+            return None
+        log.error("IPC dropping {} bytes of a malformed reply".format(len(buffer) - len(line)))
+        self._message_error()
+        return msg
+
+    async def _reader(self, reader):
+        buffer = b''
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionResetError('IPC connection closed by peer')
+            buffer += line
+            if buffer.lstrip()[:1] not in (b'{', b'['):
+                buffer = b''
+                continue
+            try:
+                msg = self._decode(buffer)
+            except MessageError as e:
+                msg = self._resync(buffer, line)
+                if msg is None:
+                    #a multi line reply, keep reading until it parses
+                    if len(buffer) > self._limit:
+                        log.error("IPC dropping {} bytes that never parsed".format(len(buffer)))
+                        self._message_error()
+                        buffer = b''
+                    continue
+            buffer = b''
+            log.debug("IPC decoded recv'd msg as {}".format(msg))
+            for _ in range(self._dispatch_in_flight(msg)):
+                self._in_flight_sem.release()
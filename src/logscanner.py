@@ -0,0 +1,82 @@
+from .exceptions import JsonRPCError
+from .transport import RequestFailed
+from .types import Types
+
+import asyncio as aio
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+"""
+The websocket close code a node sends when a reply is over its size limit.
+"""
+MESSAGE_TOO_BIG = 1009
+
+
+class LogScanner(object):
+    """
+    Walks a block range with eth_getLogs for the given contract addresses
+    and events. A chunk the node refuses, or whose reply is too big, is
+    split in half and retried. Chunks grow again while results stay under
+    target logs, up to max_chunk blocks.
+    """
+    __slots__ = ["_eth","_addresses","_events","_chunk","_max_chunk","_target","_splits"]
+
+    def __init__(self, eth, addresses=None, events=None, chunk=1000, max_chunk=100000, target=1000):
+        self._eth = eth
+        self._addresses = list(addresses) if addresses else None
+        self._events = {event.topic.as_str():event for event in events or []}
+        self._chunk = chunk
+        self._max_chunk = max_chunk
+        self._target = target
+        self._splits = 0
+
+    @property
+    def chunk(self):
+        return self._chunk
+
+    @property
+    def topics(self):
+        return [[event.topic for event in self._events.values()]] if self._events else None
+
+    def _too_big(self, exception):
+        if isinstance(exception, (JsonRPCError, RequestFailed, aio.TimeoutError)):
+            return True
+        return getattr(exception, "code", None) == MESSAGE_TOO_BIG
+
+    async def scan(self, start, stop):
+        """
+        Yields (first block, last block, logs) for consecutive chunks of
+        start to stop inclusive, in order.
+        """
+        block = start
+        while block <= stop:
+            end = min(block + self._chunk - 1, stop)
+            try:
+                logs = await self._eth.getLogs(Types.uint256(block),Types.uint256(end),self._addresses,self.topics)
+            except Exception as e:
+                if end == block or not self._too_big(e):
+                    raise
+                self._chunk = max(1, (end - block + 1) // 2)
+                self._splits += 1
+                log.debug("LogScanner splitting {}-{} after {}".format(block,end,repr(e)))
+                continue
+            yield block, end, logs
+            block = end + 1
+            if len(logs) < self._target // 2:
+                self._chunk = min(self._max_chunk, self._chunk * 2)
+            elif len(logs) > self._target:
+                self._chunk = max(1, self._chunk // 2)
+
+    def decode(self, log_entry):
+        """
+        Decodes a log with the scanned event matching its topic, None if
+        there is none.
+        """
+        event = self._events.get(log_entry.topic.as_str(),None)
+        return event.decode(log_entry) if event else None
+
+    def stats(self):
+        return {"chunk":self._chunk,"splits":self._splits}
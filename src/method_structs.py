@@ -84,7 +84,8 @@ class Block(object):
         self._gasLimit = Types.uint256(block["gasLimit"])
         self._gasUsed = Types.uint256(block["gasUsed"])
         self._timestamp = Types.uint256(block["timestamp"])
-        self._transactions = [Types.bytes32(t) for t in block["transactions"]]
+        #hashes, or Transaction structs for blocks fetched with full_transactions
+        self._transactions = [Transaction(t) if isinstance(t, dict) else Types.bytes32(t) for t in block["transactions"]]
         self._uncles = [Types.bytes32(uncle) for uncle in block["uncles"]]
 
     @property
@@ -155,6 +156,10 @@ class Block(object):
     def transactions(self):
         return self._transactions
 
+    @property
+    def transactionHashes(self):
+        return [t.hash if isinstance(t, Transaction) else t for t in self._transactions]
+
     @property
     def uncles(self):
         return self._uncles
@@ -189,6 +194,10 @@ class TransactionReceipt(object):
     def blockHash(self):
         return self._blockHash
 
+    @property
+    def blockNumber(self):
+        return self._blockNumber
+
     @property
     def contractaddress(self):
         return self._contractaddress
@@ -234,7 +243,9 @@ class TransactionReceipt(object):
 class TransactionObject(object):
     __slots__=["_to","_frm","_data","_value","_gas"]
     def __init__(self, to, frm, data, value, gas):
-        Types.addressCheck(to)
+        #no to is a contract creation
+        if to is not None:
+            Types.addressCheck(to)
         self._to = to
         if frm:
             Types.addressCheck(frm)
@@ -309,15 +320,15 @@ class Transaction(object):
 
     @property
     def blockHash(self):
-        return self.blockHash
+        return self._blockHash
 
     @property
     def blockNumber(self):
-        return self.blockNumber
+        return self._blockNumber
 
     @property
     def transactionIndex(self):
-        return self.transactionIndex
+        return self._transactionIndex
 
     @property
     def frm(self):
@@ -391,8 +402,10 @@ class Log(object):
             self._topics = [Types.bytes32(0)]
         self._transactionHash = Types.bytes32(log["transactionHash"])
         self._transactionIndex = Types.uint256(log["transactionIndex"])
-        self._transactionLogIndex = Types.uint256(log["transactionLogIndex"])
-        self._type = log["type"]
+        #parity only fields
+        transactionLogIndex = log.get("transactionLogIndex",None)
+        self._transactionLogIndex = Types.uint256(transactionLogIndex) if transactionLogIndex is not None else None
+        self._type = log.get("type",None)
 
     @property
     def topic(self):
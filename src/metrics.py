@@ -0,0 +1,192 @@
+from bisect import bisect_left
+import logging
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+"""
+Histogram bucket upper bounds in seconds, doubling from 100us to about 52s.
+"""
+BOUNDS = [0.0001 * 2**i for i in range(20)]
+
+
+class Histogram(object):
+    __slots__ = ["_counts","_count","_sum","_max"]
+
+    def __init__(self):
+        self._counts = [0 for _ in range(len(BOUNDS) + 1)]
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+
+    def observe(self, value):
+        self._counts[bisect_left(BOUNDS, value)] += 1
+        self._count += 1
+        self._sum += value
+        if value > self._max:
+            self._max = value
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q quantile.
+        """
+        if not self._count:
+            return 0.0
+        rank = q * self._count
+        seen = 0
+        for i, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                return BOUNDS[i] if i < len(BOUNDS) else self._max
+        return self._max
+
+    def snapshot(self):
+        return {
+            "count":self._count,
+            "sum":self._sum,
+            "mean":self._sum / self._count if self._count else 0.0,
+            "max":self._max,
+            "p50":self.quantile(0.5),
+            "p90":self.quantile(0.9),
+            "p99":self.quantile(0.99),
+            "buckets":{bound:count for bound, count in zip(BOUNDS + ["inf"], self._counts) if count},
+        }
+
+
+class MethodMetrics(object):
+    __slots__ = ["queued","wire","decode","requests","responses","bytes_out","bytes_in"]
+
+    def __init__(self):
+        self.queued = Histogram()
+        self.wire = Histogram()
+        self.decode = Histogram()
+        self.requests = 0
+        self.responses = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def snapshot(self):
+        return {
+            "queued":self.queued.snapshot(),
+            "wire":self.wire.snapshot(),
+            "decode":self.decode.snapshot(),
+            "requests":self.requests,
+            "responses":self.responses,
+            "bytes_out":self.bytes_out,
+            "bytes_in":self.bytes_in,
+        }
+
+
+def methods_of(channel):
+    request = channel.request
+    if isinstance(request, list):
+        return [r.get("method") for r in request]
+    return [request.get("method")]
+
+
+class Metrics(object):
+    """
+    Per JSONRPC method counters and latency histograms for one transport.
+    The transport only calls into this when metrics are enabled. Bytes and
+    decode time are measured per frame and split evenly over its requests.
+    """
+    __slots__ = ["_methods","_in_flight","_prune_at","_frame","_connects","_reconnects","_message_errors","_bytes_out","_bytes_in"]
+
+    def __init__(self):
+        self._methods = {}
+        self._in_flight = {}
+        self._prune_at = 1024
+        self._frame = (0, 0.0)
+        self._connects = 0
+        self._reconnects = 0
+        self._message_errors = 0
+        self._bytes_out = 0
+        self._bytes_in = 0
+
+    def _method(self, name):
+        metrics = self._methods.get(name,None)
+        if metrics is None:
+            metrics = self._methods[name] = MethodMetrics()
+        return metrics
+
+    def sent(self, channels, nbytes, now):
+        self._bytes_out += nbytes
+        names = [name for channel in channels for name in methods_of(channel)]
+        share = nbytes // len(names) if names else 0
+        for channel in channels:
+            queued = now - channel.queued_at if channel.queued_at is not None else None
+            for name in methods_of(channel):
+                metrics = self._method(name)
+                metrics.requests += 1
+                metrics.bytes_out += share
+                if queued is not None:
+                    metrics.queued.observe(queued)
+            self._in_flight[id(channel)] = channel
+        if len(self._in_flight) > self._prune_at:
+            self._prune()
+            self._prune_at = max(1024, 2 * len(self._in_flight))
+
+    def frame_in(self, nbytes, decode_time):
+        """
+        Records a frame as read off the wire, for the channels it completes.
+        """
+        self._bytes_in += nbytes
+        self._frame = (nbytes, decode_time)
+
+    def received(self, channels):
+        now = time.monotonic()
+        nbytes, decode_time = self._frame
+        names = [name for channel in channels for name in methods_of(channel)]
+        share = nbytes // len(names) if names else 0
+        for channel in channels:
+            self._in_flight.pop(id(channel),None)
+            wire = now - channel.sent_at if channel.sent_at is not None else None
+            for name in methods_of(channel):
+                metrics = self._method(name)
+                metrics.responses += 1
+                metrics.bytes_in += share
+                metrics.decode.observe(decode_time)
+                if wire is not None:
+                    metrics.wire.observe(wire)
+        self._frame = (0, 0.0)
+
+    def connected(self, reconnect=None):
+        """
+        Counts a connection opened. Unless told otherwise, every one after
+        the first is a reconnect.
+        """
+        if reconnect is None:
+            reconnect = self._connects > 0
+        self._connects += 1
+        if reconnect:
+            self._reconnects += 1
+
+    def message_error(self):
+        self._message_errors += 1
+
+    def _prune(self):
+        for key, channel in list(self._in_flight.items()):
+            if channel.done or channel.cancelled:
+                del self._in_flight[key]
+
+    def snapshot(self):
+        self._prune()
+        in_flight = {}
+        for channel in self._in_flight.values():
+            for name in methods_of(channel):
+                in_flight[name] = in_flight.get(name,0) + 1
+        methods = {}
+        for name, metrics in self._methods.items():
+            methods[name] = metrics.snapshot()
+            methods[name]["in_flight"] = in_flight.get(name,0)
+        return {
+            "methods":methods,
+            "in_flight":sum(in_flight.values()),
+            "bytes_out":self._bytes_out,
+            "bytes_in":self._bytes_in,
+            "connects":self._connects,
+            "reconnects":self._reconnects,
+            "message_errors":self._message_errors,
+        }
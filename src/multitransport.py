@@ -0,0 +1,128 @@
+from .health import HealthMonitor
+
+import asyncio as aio
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+def merge_queue_stats(members):
+    """
+    Sums the queue_stats of several transports into one dict.
+    """
+    depth_by_priority = {}
+    for stats in members:
+        for priority, depth in stats["depth_by_priority"].items():
+            depth_by_priority[priority] = depth_by_priority.get(priority,0) + depth
+    dequeued = sum(stats["dequeued"] for stats in members)
+    return {
+        "depth":sum(stats["depth"] for stats in members),
+        "maxsize":sum(stats["maxsize"] for stats in members),
+        "depth_by_priority":depth_by_priority,
+        "oldest_wait":max(stats["oldest_wait"] for stats in members),
+        "mean_wait":sum(stats["mean_wait"] * stats["dequeued"] for stats in members) / dequeued if dequeued else 0.0,
+        "dequeued":dequeued,
+        "rejected":sum(stats["rejected"] for stats in members),
+        "shed":sum(stats["shed"] for stats in members),
+        "in_flight":sum(stats["in_flight"] for stats in members),
+        "members":members,
+    }
+
+
+class MultiTransport(object):
+    """
+    What the transports made of several member transports share: running
+    the members and restarting each one that fails on its own backoff, an
+    optional HealthMonitor, the merged stats, readiness and closing.
+    """
+    __slots__ = ["loop","_members","_failures","_canary","_health"]
+
+    NAME = "Multi"
+
+    def __init__(self, members, health_interval=None, max_lag=2, loop=None):
+        self.loop = loop or aio.get_event_loop()
+        self._members = list(members)
+        self._failures = [0 for _ in self._members]
+        self._canary = aio.Event()
+        self._health = HealthMonitor(self._members,health_interval,max_lag=max_lag) if health_interval else None
+
+    @property
+    def members(self):
+        return self._members
+
+    @property
+    def health(self):
+        return self._health
+
+    async def run(self):
+        members = [self._run_member(index) for index in range(len(self._members))]
+        if self._health:
+            members.append(self._health.run())
+        await aio.gather(*members)
+
+    async def _run_member(self, index):
+        member = self._members[index]
+        while not self._canary.is_set():
+            connected = aio.ensure_future(member.wait_ready())
+            try:
+                await member.run()
+            except Exception as e:
+                if self._canary.is_set():
+                    break
+                log.error('{} member {} failed with {}. Reconnecting.'.format(self.NAME,index,repr(e)))
+            finally:
+                if connected.done() and not connected.cancelled():
+                    #it got a connection up, so this is a fresh run of failures
+                    self._failures[index] = 0
+                connected.cancel()
+            if not self._canary.is_set():
+                self._failures[index] += 1
+                member.reset()
+                self._redispatch(index)
+                await member._wait_backoff(self._failures[index])
+
+    def _redispatch(self, index):
+        """
+        Hands the requests queued on a failed member to the ready ones, so
+        they do not wait out its backoff.
+        """
+        live = [member for i, member in enumerate(self._members) if i != index and member.ready]
+        if not live:
+            return
+        channels = self._members[index].take_queued()
+        for i, channel in enumerate(channels):
+            live[i % len(live)].adopt(channel)
+        if channels:
+            log.debug("{} moved {} requests off member {}".format(self.NAME,len(channels),index))
+
+    def rate_stats(self):
+        return [member.rate_stats() for member in self._members]
+
+    def metrics(self):
+        return [member.metrics() for member in self._members]
+
+    def queue_stats(self):
+        return merge_queue_stats([member.queue_stats() for member in self._members])
+
+    @property
+    def ready(self):
+        return any(member.ready for member in self._members)
+
+    async def wait_ready(self, timeout=None):
+        waiters = [aio.ensure_future(member.wait_ready()) for member in self._members]
+        try:
+            done, pending = await aio.wait(waiters,timeout=timeout,return_when=aio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        if not done:
+            raise aio.TimeoutError
+
+    async def close(self):
+        log.debug("{} close called".format(self.NAME))
+        if not self._canary.is_set():
+            self._canary.set()
+        if self._health:
+            self._health.close()
+        await aio.gather(*[member.close() for member in self._members])
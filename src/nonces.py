@@ -0,0 +1,113 @@
+from .types import Types
+
+import asyncio as aio
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+class NonceManager(object):
+    """
+    Hands out nonces per sender from a local counter, so only the first
+    transaction of a sender, or the first after a reconcile, costs an
+    eth_getTransactionCount round trip. A reread never goes below a nonce
+    still in flight or already accepted, and refused nonces are handed
+    out again before new ones. Nothing is persisted: after a restart the
+    counter is seeded again from the node's pending count.
+    """
+    __slots__ = ["_eth","_next","_locks","_in_flight","_accepted","_free","_stale","_reconciles"]
+
+    def __init__(self, eth):
+        self._eth = eth
+        self._next = {}
+        self._locks = {}
+        self._in_flight = {}
+        self._accepted = {}
+        self._free = {}
+        self._stale = set()
+        self._reconciles = 0
+
+    def _lock(self, sender):
+        lock = self._locks.get(sender,None)
+        if lock is None:
+            lock = self._locks[sender] = aio.Lock()
+        return lock
+
+    async def _sync(self, sender):
+        node = (await self._eth.getTransactionCount(Types.address(sender),"pending")).as_int()
+        #the pending count lags nonces sent but not yet pooled, or pooled behind a gap
+        in_flight = self._in_flight.get(sender,())
+        count = max([node, self._accepted.get(sender,-1) + 1] + [nonce + 1 for nonce in in_flight])
+        local = self._next.get(sender,None)
+        if local is not None and local != count:
+            log.debug("NonceManager {} moved from {} to {}".format(sender,local,count))
+        self._next[sender] = count
+        self._free[sender] = {nonce for nonce in self._free.get(sender,()) if node <= nonce < count}
+        self._stale.discard(sender)
+        self._reconciles += 1
+
+    async def acquire(self, sender):
+        """
+        The next nonce for sender, held as in flight until confirm or
+        release is called with it.
+        """
+        sender = str(sender).lower()
+        async with self._lock(sender):
+            if sender not in self._next or sender in self._stale:
+                await self._sync(sender)
+            free = self._free.get(sender,None)
+            if free:
+                nonce = min(free)
+                free.discard(nonce)
+            else:
+                nonce = self._next[sender]
+                self._next[sender] = nonce + 1
+            self._in_flight.setdefault(sender,set()).add(nonce)
+            return nonce
+
+    def confirm(self, sender, nonce):
+        """
+        The node accepted a transaction with nonce.
+        """
+        sender = str(sender).lower()
+        self._in_flight.get(sender,set()).discard(nonce)
+        self._accepted[sender] = max(nonce, self._accepted.get(sender,-1))
+
+    def release(self, sender, nonce):
+        """
+        The node refused a transaction with nonce, so it is unused. The
+        newest nonce rolls the counter back, any other is handed out again
+        by the next acquire so no gap is left behind.
+        """
+        sender = str(sender).lower()
+        self._in_flight.get(sender,set()).discard(nonce)
+        if self._next.get(sender,None) == nonce + 1:
+            self._next[sender] = nonce
+        else:
+            log.debug("NonceManager {} released nonce {} out of order".format(sender,nonce))
+            self._free.setdefault(sender,set()).add(nonce)
+
+    def forget(self, sender, nonce):
+        """
+        Whether the node took the transaction with nonce is unknown, so
+        the counter is reread from the node on the next acquire.
+        """
+        sender = str(sender).lower()
+        self._in_flight.get(sender,set()).discard(nonce)
+        self._stale.add(sender)
+
+    async def reconcile(self, sender):
+        """
+        Rereads the pending count of sender from the node now.
+        """
+        sender = str(sender).lower()
+        async with self._lock(sender):
+            await self._sync(sender)
+
+    def stats(self):
+        return {
+            "senders":{sender:{"next":nonce,"in_flight":len(self._in_flight.get(sender,())),"free":len(self._free.get(sender,()))}
+                       for sender, nonce in self._next.items()},
+            "reconciles":self._reconciles,
+        }
@@ -1,6 +1,7 @@
 from .types import Types
 
 import asyncio as aio
+from collections import deque
 import logging
 
 
@@ -8,14 +9,24 @@ log = logging.getLogger(__name__)
 
 
 class Poller(object):
-    __slots__ = ["_eth","_callback","_maxSeenBN","_blocktime","_canary","_loop"]
+    """
+    Calls callback with each new block number, in order. With a prefetch
+    function, prefetch is run for up to window blocks ahead while earlier
+    ones are handled, and callback is also given what prefetch returned
+    for its block, or None if that failed. At most window prefetched
+    blocks are held at a time.
+    """
+    __slots__ = ["_eth","_callback","_maxSeenBN","_blocktime","_canary","_loop","_health","_prefetch","_window"]
 
-    def __init__(self, eth, callback, maxSeenBN=1, blocktime=8, loop=None):
+    def __init__(self, eth, callback, maxSeenBN=1, blocktime=8, health=None, prefetch=None, window=8, loop=None):
         self._loop = loop or aio.get_event_loop()
         self._callback = callback
         self._maxSeenBN = Types.uint256(maxSeenBN)
         self._blocktime = blocktime
         self._eth = eth
+        self._health = health
+        self._prefetch = prefetch
+        self._window = max(1, window)
 
     async def run(self):
         self._canary = aio.Event()
@@ -24,10 +35,38 @@ class Poller(object):
             try:
                 bn = await self._eth.blockNumber()
             except TimeoutError:
-                pass
+                continue
+            if self._health and self._health.safe_head is not None:
+                #only announce blocks every node in rotation can serve
+                bn = min(bn, Types.uint256(self._health.safe_head))
+            if self._prefetch is None:
+                while self._maxSeenBN <= bn:
+                    await self._callback(self._maxSeenBN)
+                    self._maxSeenBN+=Types.uint256(1)
+            else:
+                await self._deliver(bn)
+
+    async def _fetch(self, blocknumber):
+        try:
+            return await self._prefetch(blocknumber)
+        except Exception as e:
+            log.debug("Poller prefetch of {} failed with {}".format(blocknumber.as_int(),repr(e)))
+            return None
+
+    async def _deliver(self, bn):
+        pending = deque()
+        nextBN = self._maxSeenBN
+        try:
             while self._maxSeenBN <= bn:
-                await self._callback(self._maxSeenBN)
+                while len(pending) < self._window and nextBN <= bn:
+                    pending.append(aio.ensure_future(self._fetch(nextBN)))
+                    nextBN+=Types.uint256(1)
+                fetched = await pending.popleft()
+                await self._callback(self._maxSeenBN, fetched)
                 self._maxSeenBN+=Types.uint256(1)
+        finally:
+            for task in pending:
+                task.cancel()
 
     async def close(self):
         self._canary.set()
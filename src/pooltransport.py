@@ -0,0 +1,62 @@
+from .multitransport import MultiTransport
+from .requestqueue import HIGHPRIORITY
+from .wstransport import WSTransport
+
+import asyncio as aio
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+class WSPoolTransport(MultiTransport):
+    """
+    Holds a pool of websocket connections, possibly to several endpoints,
+    and sends each call to the member with the fewest outstanding requests.
+    Members reconnect independently of each other. With health_interval set
+    a HealthMonitor steers calls away from slow, failing or lagging nodes.
+    """
+    __slots__ = ["_endpoints","_outstanding","_transport_kwargs"]
+
+    NAME = "Pool"
+
+    def __init__(self, endpoints, size=1, health_interval=None, max_lag=2, loop=None, **transport_kwargs):
+        self.loop = loop or aio.get_event_loop()
+        self._endpoints = [tuple(endpoint) for endpoint in endpoints for _ in range(size)]
+        self._transport_kwargs = transport_kwargs
+        super().__init__([self._build_member(host,port) for host, port in self._endpoints],
+                         health_interval, max_lag, self.loop)
+        self._outstanding = [0 for _ in self._members]
+
+    def _build_member(self, host, port):
+        return WSTransport(host, port, loop=self.loop, **self._transport_kwargs)
+
+    @property
+    def outstanding(self):
+        return list(self._outstanding)
+
+    def _select(self):
+        candidates = [i for i, member in enumerate(self._members) if member.ready] or range(len(self._members))
+        if self._health:
+            healthy = [i for i in candidates if self._health.score(i) > 0.0] or candidates
+            return min(healthy, key=lambda i: (self._outstanding[i] + 1) / (self._health.score(i) or 0.01))
+        return min(candidates, key=self._outstanding.__getitem__)
+
+    async def call(self, msg, priority=HIGHPRIORITY, timeout=None, retries=None, idempotent=True):
+        index = self._select()
+        log.debug("Pool dispatching to member {} with {} outstanding".format(index,self._outstanding[index]))
+        self._outstanding[index] += 1
+        try:
+            response = await self._members[index].call(msg,priority,timeout,retries,idempotent)
+        except aio.CancelledError:
+            raise
+        except Exception:
+            if self._health:
+                self._health.record(index,False)
+            raise
+        else:
+            if self._health:
+                self._health.record(index,True)
+            return response
+        finally:
+            self._outstanding[index] -= 1
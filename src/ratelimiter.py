@@ -0,0 +1,89 @@
+import asyncio as aio
+import logging
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket(object):
+    """
+    Allows rate requests per second on average and bursts of up to burst.
+    Callers wait their turn in FIFO order rather than being refused.
+    """
+    __slots__ = ["_rate","_burst","_tokens","_updated","_lock","_waits","_waited","_max_wait"]
+
+    def __init__(self, rate, burst=None):
+        self._rate = float(rate)
+        self._burst = float(burst if burst is not None else max(rate, 1))
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._lock = aio.Lock()
+        self._waits = 0
+        self._waited = 0.0
+        self._max_wait = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    async def acquire(self, tokens=1):
+        start = time.monotonic()
+        async with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                await aio.sleep((tokens - self._tokens) / self._rate)
+                self._refill()
+            self._tokens -= tokens
+        waited = time.monotonic() - start
+        if waited > 0.001:
+            self._waits += 1
+            self._waited += waited
+            self._max_wait = max(self._max_wait, waited)
+        return waited
+
+    def stats(self):
+        return {
+            "rate":self._rate,
+            "burst":self._burst,
+            "tokens":self._tokens,
+            "waits":self._waits,
+            "total_wait":self._waited,
+            "max_wait":self._max_wait,
+        }
+
+
+class RateLimiter(object):
+    """
+    Token buckets for a transport, one over every request and one for each
+    JSONRPC method given in methods as method: (rate, burst).
+    """
+    __slots__ = ["_bucket","_methods"]
+
+    def __init__(self, rate=None, burst=None, methods=None):
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        self._methods = {method:TokenBucket(*limit) for method, limit in (methods or {}).items()}
+
+    async def acquire(self, msg):
+        requests = msg if isinstance(msg, list) else [msg]
+        waited = 0.0
+        if self._bucket:
+            waited += await self._bucket.acquire(len(requests))
+        if self._methods:
+            counts = {}
+            for request in requests:
+                method = request["method"]
+                if method in self._methods:
+                    counts[method] = counts.get(method,0) + 1
+            for method, count in counts.items():
+                waited += await self._methods[method].acquire(count)
+        if waited:
+            log.debug("RateLimiter held request for {:.3f}s".format(waited))
+        return waited
+
+    def stats(self):
+        return {
+            "global":self._bucket.stats() if self._bucket else None,
+            "methods":{method:bucket.stats() for method, bucket in self._methods.items()},
+        }
@@ -0,0 +1,226 @@
+from .exceptions import JsonRPCError
+from .requestqueue import HIGHPRIORITY
+from .structs import Structs
+from .tracing import (OBSERVERS, trace)
+
+import asyncio as aio
+from itertools import count
+import logging
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+"""
+Request ids, unique within the process and cheap to make and to encode.
+"""
+_ids = count(1)
+
+
+class Request(object):
+    """
+    A single JSONRPC call, or a raw frame handed to Transport.call. The
+    transports queue it, send it and route its response back by id to the
+    future get awaits. The caller then resolves that response to a typed
+    result with the parser of its method.
+    """
+    __slots__ = ["_future","_method","_params","_id","_parser","_payload","_priority","_deadline","_retries",
+                 "_idempotent","_attempts","_cancelled","_queued_at","_sent_at","_written_at","_result","_exception",
+                 "_complete"]
+
+    def __init__(self, parser, method, params, priority=HIGHPRIORITY, idempotent=False):
+        self._parser = parser
+        self._method = method
+        self._params = params or []
+        self._id = next(_ids)
+        self._payload = None
+        self._priority = priority
+        self._idempotent = idempotent
+        self._future = None
+        self._deadline = None
+        self._retries = 3
+        self._attempts = 0
+        self._cancelled = False
+        self._queued_at = None
+        self._sent_at = None
+        self._written_at = None
+        self._result = None
+        self._exception = None
+        self._complete = False
+
+    @classmethod
+    def frame(cls, msg, priority=HIGHPRIORITY, idempotent=True):
+        """
+        Wraps an already built request dict, or batch list, for the transports.
+        """
+        request = cls(None, None, None, priority, idempotent)
+        request._payload = msg
+        return request
+
+    def prepare(self, priority, timeout, retries, idempotent):
+        self._priority = priority
+        self._deadline = time.monotonic() + timeout if timeout is not None else None
+        self._retries = retries
+        self._idempotent = idempotent
+
+    #transport side
+
+    def _get_future(self):
+        if self._future is None:
+            self._future = aio.get_event_loop().create_future()
+        return self._future
+
+    async def get(self):
+        return await self._get_future()
+
+    def set_response(self, response):
+        future = self._get_future()
+        if not future.done():
+            future.set_result(response)
+
+    def set_exception(self, exception):
+        future = self._get_future()
+        if not future.done():
+            future.set_exception(exception)
+
+    def cancel(self):
+        self._cancelled = True
+
+    def mark_queued(self, now):
+        self._queued_at = now
+
+    def mark_sent(self, now=None):
+        self._attempts += 1
+        self._sent_at = now
+
+    def mark_written(self, now):
+        self._written_at = now
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    @property
+    def done(self):
+        return self._future is not None and self._future.done()
+
+    @property
+    def expired(self):
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    @property
+    def deadline(self):
+        return self._deadline
+
+    @property
+    def attempts(self):
+        return self._attempts
+
+    @property
+    def retries(self):
+        return self._retries
+
+    @property
+    def idempotent(self):
+        return self._idempotent
+
+    @property
+    def priority(self):
+        return self._priority
+
+    @property
+    def queued_at(self):
+        return self._queued_at
+
+    @property
+    def sent_at(self):
+        return self._sent_at
+
+    @property
+    def written_at(self):
+        return self._written_at
+
+    @property
+    def request(self):
+        if self._payload is None:
+            self._payload = {"jsonrpc":"2.0","method":self._method,"id":self._id,"params":self._params}
+        return self._payload
+
+    @property
+    def ids(self):
+        if self._method is not None:
+            return [self._id]
+        if isinstance(self._payload, list):
+            return [r["id"] for r in self._payload]
+        return [self._payload["id"]]
+
+    #caller side
+
+    def set_result(self, result):
+        """
+        Converts a raw result with the parser of the method.
+        """
+        try:
+            self._result = result if self._parser is None else self._parser(result)
+        except Exception as e:
+            self._exception = e
+        finally:
+            self._complete = True
+
+    def resolve(self, response):
+        """
+        Takes the result, or the error, out of a JSONRPC response.
+        """
+        if OBSERVERS:
+            return self._traced_resolve(response)
+        if "error" in response:
+            self.fail(JsonRPCError(Structs.error(response["error"])))
+        else:
+            self.set_result(response["result"])
+
+    def _traced_resolve(self, response):
+        start = time.monotonic()
+        error = response.get("error",None)
+        result = response.get("result",None)
+        parsed = time.monotonic()
+        trace("parse", self._id, start, parsed)
+        if error is not None:
+            self.fail(JsonRPCError(Structs.error(error)))
+        else:
+            self.set_result(result)
+            trace("set_result", self._id, parsed)
+
+    def fail(self, exception):
+        self._exception = exception
+        self._complete = True
+
+    @property
+    def method(self):
+        return self._method
+
+    @property
+    def params(self):
+        return self._params
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def key(self):
+        return (self._method, repr(self._params))
+
+    @property
+    def complete(self):
+        return self._complete
+
+    @property
+    def result(self):
+        if self._exception:
+            raise self._exception
+        else:
+            return self._result
+
+    def as_dict(self):
+        return self.request
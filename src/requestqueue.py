@@ -0,0 +1,111 @@
+import asyncio as aio
+from collections import deque
+from itertools import count
+import logging
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+HIGHPRIORITY = 1
+LOWPRIORITY = 2
+
+
+"""
+These are the policies for a call made while the request queue is full.
+BLOCK waits for room, REJECT fails the call and SHED evicts the newest
+waiting request of a worse priority to make room, failing the call when
+there is none.
+"""
+BLOCK = 'block'
+REJECT = 'reject'
+SHED = 'shed'
+
+
+class PriorityRequestQueue(aio.Queue):
+    """
+    A request queue that hands out the waiting item with the best priority,
+    lowest number first and FIFO within a priority. An item is promoted one
+    priority level for every aging seconds it waits, so a burst of low
+    priority requests can delay high priority ones but never starve them.
+    """
+
+    def __init__(self, maxsize=0, aging=2.0, **kwargs):
+        self._aging = aging
+        self._wait = 0.0
+        self._dequeued = 0
+        self._rejected = 0
+        self._shed = 0
+        super().__init__(maxsize, **kwargs)
+
+    def _init(self, maxsize):
+        self._queue = {}
+        self._count = 0
+        self._seq = count()
+
+    def _put(self, item):
+        priority = getattr(item, "priority", LOWPRIORITY)
+        self._queue.setdefault(priority,deque()).append((time.monotonic(),next(self._seq),item))
+        self._count += 1
+
+    def _get(self):
+        now = time.monotonic()
+        def score(priority):
+            queued_at, seq, _ = self._queue[priority][0]
+            aged = (now - queued_at) / self._aging if self._aging else 0
+            return (priority - aged, seq)
+        priority = min((p for p in self._queue if self._queue[p]), key=score)
+        self._count -= 1
+        queued_at, _, item = self._queue[priority].popleft()
+        if self._dequeued:
+            self._wait += ((now - queued_at) - self._wait) * 0.1
+        else:
+            self._wait = now - queued_at
+        self._dequeued += 1
+        return item
+
+    def qsize(self):
+        return self._count
+
+    def empty(self):
+        return self._count == 0
+
+    def requeue(self, item):
+        """
+        Puts an item back without regard to maxsize, for requests that
+        were already admitted once.
+        """
+        self._put(item)
+        self._unfinished_tasks += 1
+        self._finished.clear()
+        self._wakeup_next(self._getters)
+
+    def reject(self):
+        self._rejected += 1
+
+    def shed(self, priority):
+        """
+        Removes and returns the newest waiting item with a worse priority
+        than priority, or None if there is none.
+        """
+        worse = [p for p in self._queue if p > priority and self._queue[p]]
+        if not worse:
+            return None
+        self._count -= 1
+        self._shed += 1
+        return self._queue[max(worse)].pop()[2]
+
+    def stats(self):
+        now = time.monotonic()
+        heads = [bucket[0][0] for bucket in self._queue.values() if bucket]
+        return {
+            "depth":self._count,
+            "maxsize":self.maxsize,
+            "depth_by_priority":{p:len(bucket) for p, bucket in self._queue.items() if bucket},
+            "oldest_wait":now - min(heads) if heads else 0.0,
+            "mean_wait":self._wait,
+            "dequeued":self._dequeued,
+            "rejected":self._rejected,
+            "shed":self._shed,
+        }
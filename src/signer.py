@@ -0,0 +1,38 @@
+from .hextools import add0x, bytes_to_hex
+from .types import Types
+
+import logging
+
+try:
+    from eth_account import Account
+except ImportError:
+    Account = None
+
+
+log = logging.getLogger(__name__)
+
+
+class LocalSigner(object):
+    """
+    Signs transactions with a private key held in this process, so the
+    node needs no unlocked account. Requires the eth_account package.
+    """
+    __slots__ = ["_account"]
+
+    def __init__(self, private_key):
+        if Account is None:
+            raise ImportError("LocalSigner requires the eth_account package")
+        self._account = Account.from_key(private_key)
+
+    @property
+    def address(self):
+        return Types.address(self._account.address)
+
+    def sign(self, transaction):
+        """
+        Signs a transaction dict and returns (raw transaction, hash) as
+        hex strings.
+        """
+        signed = self._account.sign_transaction(transaction)
+        raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+        return add0x(bytes_to_hex(bytes(raw))), add0x(bytes_to_hex(bytes(signed.hash)))
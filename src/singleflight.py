@@ -0,0 +1,54 @@
+from .api import READ_ONLY_METHODS
+
+import asyncio as aio
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+class SingleFlight(object):
+    """
+    Coalesces concurrent identical calls. While a call for a method and
+    params is outstanding, further callers await the same request and
+    share its decoded result. The shared request is cancelled once every
+    caller waiting on it has gone.
+    """
+    __slots__ = ["_methods","_calls","_hits","_misses"]
+
+    def __init__(self, methods=READ_ONLY_METHODS):
+        self._methods = set(methods)
+        self._calls = {}
+        self._hits = 0
+        self._misses = 0
+
+    def covers(self, abstract_method):
+        return abstract_method.method in self._methods
+
+    async def do(self, abstract_method, fn):
+        key = abstract_method.key
+        entry = self._calls.get(key,None)
+        if entry is None:
+            self._misses += 1
+            entry = [aio.ensure_future(fn()),0]
+            self._calls[key] = entry
+            entry[0].add_done_callback(lambda task: self._forget(key,entry))
+        else:
+            log.debug("SingleFlight joined outstanding {}".format(key[0]))
+            self._hits += 1
+        entry[1] += 1
+        try:
+            return await aio.shield(entry[0])
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                #a caller arriving before the cancel lands starts a fresh call
+                self._forget(key,entry)
+                entry[0].cancel()
+
+    def _forget(self, key, entry):
+        if self._calls.get(key,None) is entry:
+            del self._calls[key]
+
+    def stats(self):
+        return {"hits":self._hits,"misses":self._misses,"in_flight":len(self._calls)}
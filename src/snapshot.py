@@ -0,0 +1,126 @@
+from .solidity_types import Bytes32
+from .types import Types
+
+from collections import OrderedDict
+from contextvars import ContextVar
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+_current = ContextVar("snapshot", default=None)
+
+
+def current_snapshot():
+    return _current.get()
+
+
+def is_hash(block):
+    return isinstance(block, (Bytes32, str))
+
+
+def block_key(block):
+    return str(block) if is_hash(block) else block.as_int()
+
+
+class CallCache(object):
+    """
+    Raw eth_call results by block, then by (to, calldata, from). advance
+    is told of each new head and drops the blocks more than keep behind
+    it. At most max_blocks blocks, such as ones pinned by hash, are held.
+    """
+    __slots__ = ["_blocks","_keep","_max_blocks","_head","_hits","_misses"]
+
+    def __init__(self, keep=2, max_blocks=16):
+        self._blocks = OrderedDict()
+        self._keep = keep
+        self._max_blocks = max_blocks
+        self._head = None
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, block, key):
+        entries = self._blocks.get(block,None)
+        if entries is not None and key in entries:
+            self._hits += 1
+            return True, entries[key]
+        self._misses += 1
+        return False, None
+
+    def put(self, block, key, result):
+        entries = self._blocks.get(block,None)
+        if entries is None:
+            entries = self._blocks[block] = {}
+            while len(self._blocks) > self._max_blocks:
+                self._blocks.popitem(last=False)
+        entries[key] = result
+
+    def advance(self, head):
+        self._head = head
+        for block in [b for b in self._blocks if isinstance(b, int) and b <= head - self._keep]:
+            del self._blocks[block]
+
+    def clear(self):
+        self._blocks.clear()
+
+    def stats(self):
+        return {
+            "head":self._head,
+            "blocks":len(self._blocks),
+            "entries":sum(len(entries) for entries in self._blocks.values()),
+            "hits":self._hits,
+            "misses":self._misses,
+        }
+
+
+class Snapshot(object):
+    """
+    Pins every EncodedCall.call made inside it, including in tasks it
+    starts, to one block number or hash, the head when it is entered by
+    default. Repeated reads at that block are served from the cache.
+
+        async with w3.snapshot() as snapshot:
+            supply, balance = await aio.gather(total.call(), owned.call())
+    """
+    __slots__ = ["_eth","_cache","_block","_token"]
+
+    def __init__(self, eth, cache=None, block=None):
+        self._eth = eth
+        self._cache = cache
+        self._block = Types.uint256(block) if isinstance(block, int) else block
+        self._token = None
+
+    async def __aenter__(self):
+        if self._block is None:
+            self._block = await self._eth.blockNumber()
+        self._token = _current.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+
+    @property
+    def block(self):
+        return self._block
+
+    @property
+    def block_identifier(self):
+        return {"blockHash":self._block} if is_hash(self._block) else self._block
+
+    async def call(self, **kwargs):
+        """
+        eth_call at the pinned block, read through the cache.
+        """
+        kwargs["block_identifier"] = self.block_identifier
+        if self._cache is None:
+            return await self._eth.call(**kwargs)
+        block = block_key(self._block)
+        #everything that lands in the call object, which drops empty fields
+        key = tuple(sorted((name, str(value)) for name, value in kwargs.items() if value and name != "block_identifier"))
+        hit, result = self._cache.get(block, key)
+        if hit:
+            return result
+        result = await self._eth.call(**kwargs)
+        self._cache.put(block, key, result)
+        return result
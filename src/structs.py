@@ -1,4 +1,6 @@
 from .method_structs import (   Block,
+                                Error,
+                                Log,
                                 Response,
                                 Syncing,
                                 Transaction,
@@ -18,7 +20,7 @@ class Structs(object):
 
     @staticmethod
     def log(*args,**kwargs):
-        return Log(*arg,**kwargs)
+        return Log(*args,**kwargs)
 
     @staticmethod
     def transaction(*args,**kwargs):
@@ -0,0 +1,64 @@
+import logging
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+"""
+Observers called with a Span for every traced stage of every call. Stages
+are only timed while at least one observer is registered.
+
+    build       constructing the Request in pipeline or a Batch
+    enqueue     from call until the request is taken off the queue
+    encode      JSON encoding of the frame holding the request
+    send        writing that frame to the connection
+    receive     from the frame being written until its response is routed
+    parse       unpacking the result or error of the routed response
+    set_result  converting the result to its type in set_result
+"""
+OBSERVERS = []
+
+
+class Span(object):
+    __slots__ = ["stage","id","start","end"]
+
+    def __init__(self, stage, request_id, start, end):
+        self.stage = stage
+        self.id = request_id
+        self.start = start
+        self.end = end
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def as_dict(self):
+        return {"stage":self.stage,"id":self.id,"start":self.start,"end":self.end}
+
+    def __repr__(self):
+        return "Span({}, {}, {:.6f}s)".format(self.stage,self.id,self.duration)
+
+
+def add_observer(observer):
+    OBSERVERS.append(observer)
+
+
+def remove_observer(observer):
+    if observer in OBSERVERS:
+        OBSERVERS.remove(observer)
+
+
+def trace(stage, request_id, start, end=None):
+    """
+    Hands a span to every observer. A failing observer is logged and never
+    breaks the call being traced.
+    """
+    if start is None:
+        return
+    span = Span(stage, request_id, start, time.monotonic() if end is None else end)
+    for observer in OBSERVERS:
+        try:
+            observer(span)
+        except Exception as e:
+            log.error("Trace observer {} failed with {}".format(observer,repr(e)))
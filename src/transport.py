@@ -0,0 +1,431 @@
+from .metrics import Metrics
+from .request import Request
+from .requestqueue import (BLOCK, HIGHPRIORITY, PriorityRequestQueue, SHED)
+from .tracing import (OBSERVERS, trace)
+
+import asyncio as aio
+import logging
+import random
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+class MessageError(Exception):
+    """
+    Indicates exception was raised due to a bad message format.
+    """
+
+
+class RequestFailed(Exception):
+    """
+    Raised when a request is lost with its connection and may not be resent,
+    either because it is not idempotent or its retry budget is spent.
+    """
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request is refused or shed because the request queue is full.
+    """
+
+
+class Transport(object):
+    """
+    Queue handling shared by the transports. Callers put Requests on the
+    request queue through call and the concrete transport eats from it.
+    """
+    __slots__ = ["loop","_request_q","_canary","_ready","_encoder","_max_in_flight","_in_flight","_frames","_in_flight_sem",
+                 "_batch_window","_max_batch_size","_timeout","_retries","_overflow","_rate_limiter","_metrics"]
+
+    BACKOFF = 0.1
+    MAX_BACKOFF = 30
+    IO_TIMEOUT = 15
+
+    def __init__(self, encoder=None, max_in_flight=100, batch_window=None, max_batch_size=100, aging=2.0,
+                 timeout=None, retries=3, max_queue=0, overflow=BLOCK, rate_limiter=None, metrics=False, loop=None):
+        self.loop = loop or aio.get_event_loop()
+        self._request_q = PriorityRequestQueue(max_queue,aging=aging)
+        self._overflow = overflow
+        self._rate_limiter = rate_limiter
+        self._metrics = Metrics() if metrics is True else metrics or None
+        self._encoder = encoder
+        self._canary = aio.Event()
+        self._ready = aio.Event()
+        self._max_in_flight = max_in_flight
+        self._in_flight = {}
+        self._frames = {}
+        self._in_flight_sem = None
+        self._batch_window = batch_window
+        self._max_batch_size = max_batch_size
+        self._timeout = timeout
+        self._retries = retries
+
+    async def close(self):
+        log.debug("{} close called".format(self.__class__.__name__))
+        if not self._canary.is_set():
+            self._canary.set()
+
+    def reset(self):
+        log.debug("{} reset called".format(self.__class__.__name__))
+        self._canary.clear()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    async def wait_ready(self, timeout=None):
+        await aio.wait_for(self._ready.wait(),timeout)
+
+    def _backoff(self, failures):
+        """
+        Exponential backoff with full jitter.
+        """
+        return random.uniform(0, min(self.MAX_BACKOFF, self.BACKOFF * 2 ** max(failures - 1, 0)))
+
+    async def _wait_backoff(self, failures):
+        delay = self._backoff(failures)
+        log.debug("{} reconnecting in {:.3f}s".format(self.__class__.__name__,delay))
+        try:
+            await aio.wait_for(self._canary.wait(),delay)
+        except aio.TimeoutError:
+            pass
+
+    async def _race(self, *coros):
+        """
+        Runs coros until the first of them finishes or the transport is
+        closed, then cancels the rest. An exception from a finished coro
+        is raised.
+        """
+        tasks = [aio.ensure_future(coro) for coro in coros]
+        tasks.append(aio.ensure_future(self._canary.wait()))
+        try:
+            done, pending = await aio.wait(tasks,return_when=aio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+        for task in done:
+            if not task.cancelled() and task.exception():
+                raise task.exception()
+
+    async def call(self, msg, priority=HIGHPRIORITY, timeout=None, retries=None, idempotent=True):
+        """
+        Queues msg, a Request or a request dict or batch list, and waits for
+        its response. timeout is the deadline of the request in seconds and
+        retries the number of times it may be resent after a lost connection,
+        defaulting to the transport's settings. Requests that are not
+        idempotent are never resent. Cancelling the caller, or the deadline
+        passing, drops the request from the queue.
+        """
+        log.debug("{} call with message {}".format(self.__class__.__name__,msg))
+        timeout = self._timeout if timeout is None else timeout
+        retries = self._retries if retries is None else retries
+        channel = msg if isinstance(msg, Request) else Request.frame(msg)
+        channel.prepare(priority,timeout,retries,idempotent)
+        try:
+            return await aio.wait_for(self._submit(channel),timeout)
+        except (aio.CancelledError, aio.TimeoutError) as e:
+            channel.cancel()
+            raise e
+
+    async def _submit(self, channel):
+        if self._rate_limiter:
+            await self._rate_limiter.acquire(channel.request)
+        if self._metrics or OBSERVERS:
+            channel.mark_queued(time.monotonic())
+        await self._admit(channel)
+        log.debug("{} awaiting channel for msg {}".format(self.__class__.__name__,channel.request))
+        return await channel.get()
+
+    async def _admit(self, channel):
+        if self._overflow == BLOCK:
+            await self._request_q.put(channel)
+            return
+        try:
+            self._request_q.put_nowait(channel)
+        except aio.QueueFull:
+            victim = self._request_q.shed(channel.priority) if self._overflow == SHED else None
+            if victim is None:
+                self._request_q.reject()
+                raise Overloaded
+            log.debug("{} shed a queued request".format(self.__class__.__name__))
+            victim.set_exception(Overloaded())
+            self._request_q.requeue(channel)
+
+    def queue_stats(self):
+        """
+        Reports the request queue depth, how long requests wait in it and
+        how many were refused, so callers can throttle themselves.
+        """
+        stats = self._request_q.stats()
+        stats["in_flight"] = len({id(c) for c in self._in_flight.values()})
+        return stats
+
+    def rate_stats(self):
+        return self._rate_limiter.stats() if self._rate_limiter else None
+
+    def metrics(self):
+        """
+        Snapshot of the per method metrics, None unless enabled.
+        """
+        return self._metrics.snapshot() if self._metrics else None
+
+    def _connected(self, reconnect=None):
+        self._ready.set()
+        if self._metrics:
+            self._metrics.connected(reconnect)
+
+    def _trace_written(self, channels):
+        """
+        Closes the send span of channels once their frame is written.
+        """
+        if OBSERVERS:
+            now = time.monotonic()
+            for channel in channels:
+                channel.mark_written(now)
+                for i in channel.ids:
+                    trace("send", i, channel.sent_at, now)
+
+    def _message_error(self):
+        if self._metrics:
+            self._metrics.message_error()
+
+    def _live(self, channel):
+        """
+        Checks a channel taken from the queue is still wanted, failing it
+        if its deadline has passed.
+        """
+        if channel.cancelled:
+            log.debug("{} dropped cancelled request".format(self.__class__.__name__))
+            return False
+        if channel.expired:
+            channel.set_exception(aio.TimeoutError())
+            return False
+        return True
+
+    def take_queued(self):
+        """
+        Empties the request queue, returning the requests still wanted so
+        another transport can adopt them.
+        """
+        channels = []
+        while not self._request_q.empty():
+            channel = self._request_q.get_nowait()
+            if self._live(channel):
+                channels.append(channel)
+        return channels
+
+    def adopt(self, channel):
+        """
+        Queues a request another transport already admitted.
+        """
+        self._request_q.requeue(channel)
+
+    async def _next(self):
+        while True:
+            channel = await self._request_q.get()
+            if self._live(channel):
+                return channel
+
+    def _retry(self, channel, exception=None):
+        """
+        Puts a channel that lost its connection back on the queue if it may
+        be resent, otherwise fails it.
+        """
+        exception = exception or RequestFailed()
+        if channel.cancelled or channel.done:
+            return
+        if channel.expired:
+            channel.set_exception(aio.TimeoutError())
+        elif channel.attempts and not channel.idempotent:
+            log.debug("{} not resending non idempotent request".format(self.__class__.__name__))
+            channel.set_exception(exception)
+        elif channel.attempts > channel.retries:
+            log.debug("{} retry budget spent".format(self.__class__.__name__))
+            channel.set_exception(exception)
+        else:
+            self._request_q.requeue(channel)
+
+    def _decode(self, msg):
+        start = time.monotonic() if self._metrics else None
+        try:
+            decoded = msg if not self._encoder else self._encoder.loads(msg)
+        except Exception as e:
+            raise MessageError
+        if self._metrics:
+            self._metrics.frame_in(len(msg) if isinstance(msg, (str, bytes)) else 0, time.monotonic() - start)
+        return decoded
+
+    async def _gather_frame(self, channel):
+        channels = [channel]
+        if not self._batch_window:
+            return channels
+        await aio.sleep(self._batch_window)
+        while len(channels) < self._max_batch_size and not self._request_q.empty():
+            if self._in_flight_sem:
+                if self._in_flight_sem.locked():
+                    break
+                await self._in_flight_sem.acquire()
+            channel = self._request_q.get_nowait()
+            if self._live(channel):
+                channels.append(channel)
+            elif self._in_flight_sem:
+                self._in_flight_sem.release()
+        log.debug("{} coalesced {} requests into one frame".format(self.__class__.__name__,len(channels)))
+        return channels
+
+    async def _next_frame(self):
+        """
+        Takes the next channel off the queue, gathers a frame around it and
+        encodes it. Channels held while the frame is gathered are put back
+        on the queue if the connection is lost meanwhile.
+        """
+        channel = await self._next()
+        channels = [channel]
+        try:
+            channels = await self._gather_frame(channel)
+            return self._encode_frame(channels)
+        except (Exception, aio.CancelledError) as e:
+            for channel in channels:
+                self._retry(channel, e)
+            raise e
+
+    def _encode_frame(self, channels):
+        """
+        Encodes channels as a single message, as a JSON-RPC batch array when
+        more than one channel is sent or the channel itself holds a batch.
+        Requests that can not be encoded are failed and dropped from the frame,
+        the rest are counted as sent.
+        """
+        def payload(channels):
+            if len(channels) == 1:
+                return channels[0].request
+            requests = []
+            for channel in channels:
+                if isinstance(channel.request, list):
+                    requests.extend(channel.request)
+                else:
+                    requests.append(channel.request)
+            return requests
+        encode = lambda msg: msg if not self._encoder else self._encoder.dumps(msg)
+        start = time.monotonic() if OBSERVERS else None
+        def fail(channel):
+            self._message_error()
+            channel.set_exception(MessageError)
+            if self._in_flight_sem:
+                self._in_flight_sem.release()
+        def sent(msg, channels):
+            now = time.monotonic() if self._metrics or OBSERVERS else None
+            for channel in channels:
+                channel.mark_sent(now)
+                if OBSERVERS:
+                    for i in channel.ids:
+                        trace("enqueue", i, channel.queued_at, start)
+                        trace("encode", i, start, now)
+            if self._metrics:
+                self._metrics.sent(channels, len(msg) if isinstance(msg, (str, bytes)) else 0, now)
+            return msg, channels
+        try:
+            return sent(encode(payload(channels)), channels)
+        except Exception as e:
+            good = []
+            for channel in channels:
+                try:
+                    encode(channel.request)
+                    good.append(channel)
+                except Exception as e:
+                    fail(channel)
+            if len(good) == len(channels):
+                for channel in good:
+                    fail(channel)
+                good = []
+            if not good:
+                return None, []
+            return sent(encode(payload(good)), good)
+
+    def _dispatch(self, msg, pending):
+        """
+        Routes a response, or each element of a batch response, to the
+        channel in pending registered under its id. Returns the number of
+        channels completed.
+        """
+        responses = msg if isinstance(msg, list) else [msg]
+        grouped = {}
+        for response in responses:
+            try:
+                channel = pending.pop(response["id"],None)
+            except Exception as e:
+                channel = None
+            if channel is None:
+                log.error("{} recv'd msg for unknown id {}".format(self.__class__.__name__,response))
+                continue
+            grouped.setdefault(id(channel),(channel,[]))[1].append(response)
+        if self._metrics:
+            self._metrics.received([channel for channel, group in grouped.values()])
+        if OBSERVERS:
+            now = time.monotonic()
+            for channel, group in grouped.values():
+                for response in group:
+                    trace("receive", response["id"], channel.written_at or channel.sent_at, now)
+        for channel, group in grouped.values():
+            for i in channel.ids:
+                pending.pop(i,None)
+                self._frames.pop(i,None)
+            if isinstance(channel.request, list):
+                channel.set_response(group)
+            else:
+                channel.set_response(group[0])
+        return len(grouped)
+
+    def _dispatch_lockstep(self, msg, channels):
+        """
+        Routes the reply to a frame sent in lockstep. A whole-frame error
+        without a routable id is handed to every channel left waiting.
+        """
+        pending = {i:channel for channel in channels for i in channel.ids}
+        self._dispatch(msg, pending)
+        for channel in {id(c):c for c in pending.values()}.values():
+            if isinstance(msg, dict) and "error" in msg:
+                channel.set_response(msg)
+            else:
+                self._message_error()
+                channel.set_exception(MessageError)
+
+    def _dispatch_in_flight(self, msg):
+        """
+        Routes a reply on a connection with several frames in flight and
+        returns the number of channels completed. A whole-frame error
+        without a routable id answers a frame the node could not read, which
+        is the oldest still waiting, so it is handed to every channel of it.
+        """
+        if not (isinstance(msg, dict) and "error" in msg and msg.get("id",None) is None):
+            return self._dispatch(msg, self._in_flight)
+        frame = self._frames.get(next(iter(self._in_flight),None),())
+        channels = [channel for channel in frame if self._in_flight.get(channel.ids[0],None) is channel]
+        if not channels:
+            log.error("{} recv'd msg for unknown id {}".format(self.__class__.__name__,msg))
+            return 0
+        for channel in channels:
+            self._pop_in_flight(channel)
+            channel.set_response(msg)
+        return len(channels)
+
+    def _register_in_flight(self, channels):
+        for channel in channels:
+            for i in channel.ids:
+                self._in_flight[i] = channel
+                self._frames[i] = channels
+
+    def _pop_in_flight(self, channel):
+        for i in channel.ids:
+            self._in_flight.pop(i,None)
+            self._frames.pop(i,None)
+
+    def _requeue_in_flight(self, exception=None):
+        channels = list({id(c):c for c in self._in_flight.values()}.values())
+        self._in_flight.clear()
+        self._frames.clear()
+        log.debug("{} requeueing {} in flight requests".format(self.__class__.__name__,len(channels)))
+        for channel in channels:
+            self._retry(channel, exception)
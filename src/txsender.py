@@ -0,0 +1,154 @@
+from .exceptions import JsonRPCError
+from .nonces import NonceManager
+from .transport import RequestFailed
+from .types import Types
+
+import asyncio as aio
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+"""
+Node error messages, lower cased, for a transaction already in the pool
+and for a nonce the sender has already used, from geth and parity.
+"""
+KNOWN_MESSAGES = ("already known","known transaction","already imported")
+NONCE_LOW_MESSAGES = ("nonce too low","nonce is too low")
+
+
+def _matches(exception, messages):
+    message = str(getattr(exception, "message", "") or "").lower()
+    return any(m in message for m in messages)
+
+
+class TransactionSender(object):
+    """
+    Signs transactions locally and submits them with eth_sendRawTransaction,
+    with nonces from a NonceManager, so many can be in flight at once, at
+    most max_in_flight. A submission whose outcome is unknown, because its
+    connection dropped or it timed out, is resent with the same signed
+    bytes, which the node accepts at most once. A nonce the node reports
+    as used is reread from the node and the transaction signed again.
+    """
+    __slots__ = ["_eth","_signer","_nonces","_chain_id","_gas_price","_semaphore","_resends","_nonce_retries","_stats"]
+
+    def __init__(self, eth, signer, nonces=None, chain_id=None, gas_price=None, max_in_flight=256, resends=3, nonce_retries=3):
+        self._eth = eth
+        self._signer = signer
+        self._nonces = nonces or NonceManager(eth)
+        self._chain_id = chain_id
+        self._gas_price = gas_price
+        self._semaphore = aio.Semaphore(max_in_flight)
+        self._resends = resends
+        self._nonce_retries = nonce_retries
+        self._stats = {"sent":0,"resent":0,"known":0,"nonce_low":0,"failed":0}
+
+    @property
+    def address(self):
+        return self._signer.address
+
+    @property
+    def nonces(self):
+        return self._nonces
+
+    async def _transaction(self, to, data, value, gas, gas_price):
+        if self._chain_id is None:
+            self._chain_id = (await self._eth.chainId()).as_int()
+        if gas_price is None:
+            gas_price = self._gas_price
+        if gas_price is None:
+            gas_price = (await self._eth.gasPrice()).as_int()
+        if gas is None:
+            gas = (await self._eth.estimateGas(to=to,frm=self.address,data=data,value=Types.uint256(value) if value else 0)).as_int()
+        transaction = {
+            "chainId":self._chain_id,
+            "gasPrice":gas_price,
+            "gas":gas,
+            "value":value,
+            "data":data or "0x",
+        }
+        if to is not None:
+            transaction["to"] = str(to)
+        return transaction
+
+    async def _submit(self, raw, thash):
+        """
+        Sends raw until the node takes it, resending on an unknown outcome.
+        After a resend, a nonce too low means the earlier send landed.
+        """
+        resent = 0
+        while True:
+            try:
+                result = await self._eth.sendRawTransaction(raw)
+                self._stats["sent"] += 1
+                return result
+            except JsonRPCError as e:
+                if _matches(e, KNOWN_MESSAGES) or (resent and _matches(e, NONCE_LOW_MESSAGES)):
+                    self._stats["known"] += 1
+                    return Types.bytes32(thash)
+                raise
+            except (RequestFailed, aio.TimeoutError) as e:
+                if resent >= self._resends:
+                    raise
+                resent += 1
+                self._stats["resent"] += 1
+                log.debug("TransactionSender resending {} after {}".format(thash,repr(e)))
+
+    async def send(self, to=None, data=None, value=0, gas=None, gas_price=None):
+        """
+        Signs and submits one transaction, returning its hash once the
+        node has it. value and gas_price are ints in wei.
+        """
+        sender = self.address
+        if isinstance(to, str):
+            to = Types.address(to)
+        async with self._semaphore:
+            #the nonce is taken first, so concurrent sends get them in call order
+            nonce = await self._nonces.acquire(sender)
+            transaction = None
+            attempt = 0
+            sent = False
+            try:
+                while True:
+                    try:
+                        if transaction is None:
+                            transaction = await self._transaction(to, data, value, gas, gas_price)
+                        raw, thash = self._signer.sign(dict(transaction, nonce=nonce))
+                        sent = True
+                        result = await self._submit(raw, thash)
+                    except JsonRPCError as e:
+                        if not (sent and _matches(e, NONCE_LOW_MESSAGES) and attempt < self._nonce_retries):
+                            raise
+                        attempt += 1
+                        self._stats["nonce_low"] += 1
+                        log.debug("TransactionSender nonce {} of {} already used".format(nonce,sender))
+                        self._nonces.forget(sender, nonce)
+                        nonce, sent = None, False
+                        await self._nonces.reconcile(sender)
+                        nonce = await self._nonces.acquire(sender)
+                        continue
+                    self._nonces.confirm(sender, nonce)
+                    return result
+            except BaseException as e:
+                if nonce is not None:
+                    self._stats["failed"] += 1
+                    if sent and not isinstance(e, JsonRPCError):
+                        #the node may hold it after all, so the count is reread
+                        self._nonces.forget(sender, nonce)
+                    else:
+                        #never sent, or refused by the node, so the nonce is free
+                        self._nonces.release(sender, nonce)
+                raise
+
+    async def send_many(self, transactions):
+        """
+        Submits dicts of send arguments concurrently, handing out nonces in
+        the order given. Hashes come back in that order, with the exception
+        in place of any that failed.
+        """
+        return await aio.gather(*[self.send(**transaction) for transaction in transactions], return_exceptions=True)
+
+    def stats(self):
+        return dict(self._stats, nonces=self._nonces.stats())
@@ -1,52 +1,156 @@
-from .api import (Eth, Personal)
+from .api import (Eth, Parity, Personal)
+from .cache import ResponseCache
+from .diskcache import DiskCache
 from .callablecontract import CallableContract
 from .filter import Filter
+from .health import HealthMonitor
 from .hextools import HexTools
 from .keccak import keccak
+from .logscanner import LogScanner
+from .metrics import Metrics
+from .nonces import NonceManager
 from .poller import Poller
+from .signer import LocalSigner
+from .singleflight import SingleFlight
+from .snapshot import (CallCache, Snapshot)
 from .soliditykeccak import solidityKeccak
 from .structs import Structs
+from .tracing import (OBSERVERS, add_observer, remove_observer, Span, trace)
+from .txsender import TransactionSender
 from .types import Types
 from .w3json import w3json
 from .wstransport import WSTransport
-from .channel import Channel
+from .pooltransport import WSPoolTransport
+from .failovertransport import FailoverTransport
+from .ratelimiter import RateLimiter
+from .httptransport import HTTPTransport
+from .ipctransport import IPCTransport
+from .request import Request
+from .exceptions import MissingResponse
 
 import asyncio as aio
 from attrdict import AttrDict
 import logging
 from functools import partial
+import time
 
 
 log = logging.getLogger(__name__)
 
 
-async def pipeline(transport,abstract_method,*args,**kwargs):
+async def pipeline(transport,abstract_method,*args,priority=None,timeout=None,retries=None,singleflight=None,cache=None,**kwargs):
+    start = time.monotonic() if OBSERVERS else None
     abm = abstract_method(*args,**kwargs)
+    if start is not None:
+        trace("build", abm.id, start)
+    if cache and cache.covers(abm):
+        hit, result = cache.get(abm)
+        if hit:
+            return result
+    if singleflight and singleflight.covers(abm):
+        return await singleflight.do(abm,partial(send,transport,abm,priority,timeout,retries,cache))
+    return await send(transport,abm,priority,timeout,retries,cache)
+
+async def send(transport,abm,priority=None,timeout=None,retries=None,cache=None):
     try:
-        response = await transport.call(abm.as_dict())
+        priority = abm.priority if priority is None else priority
+        response = await transport.call(abm,priority,timeout,retries,abm.idempotent)
         #log.debug('Pipeline got response as {}'.format(response))
-        abm.set_response(response)
+        abm.resolve(response)
+        if cache:
+            cache.observe(abm,abm.result,response)
+    except aio.CancelledError:
+        #the caller gave up, let it see the cancellation
+        raise
     except Exception as e:
-        abm.set_exception(e)
-    finally:
-        return abm.result
+        abm.fail(e)
+    return abm.result
 
 combine = lambda L: { k: v for d in L for k, v in d.items() }
 
-pipe = lambda transport,api: combine([{method:partial(pipeline,transport,getattr(api,method))} for method in dir(api) if method[0] != '_'])
+pipe = lambda transport,api,singleflight=None,cache=None: combine([{method:partial(pipeline,transport,getattr(api,method),singleflight=singleflight,cache=cache)} for method in dir(api) if method[0] != '_'])
+
+
+class Batch(object):
+    __slots__=["_transport","_methods","_eth","_personal"]
+
+    def __init__(self, transport):
+        self._transport = transport
+        self._methods = []
+        self._eth = AttrDict(self._collect(Eth))
+        self._personal = AttrDict(self._collect(Personal))
+
+    def _collect(self, api):
+        return combine([{method:partial(self.add,getattr(api,method))} for method in dir(api) if method[0] != '_'])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.send()
+
+    def add(self, abstract_method, *args, **kwargs):
+        start = time.monotonic() if OBSERVERS else None
+        abm = abstract_method(*args,**kwargs)
+        if start is not None:
+            trace("build", abm.id, start)
+        self._methods.append(abm)
+        return abm
+
+    async def send(self, timeout=None, retries=None):
+        methods, self._methods = self._methods, []
+        if not methods:
+            return
+        try:
+            priority = min(abm.priority for abm in methods)
+            idempotent = all(abm.idempotent for abm in methods)
+            responses = await self._transport.call([abm.as_dict() for abm in methods],priority,timeout,retries,idempotent)
+        except aio.CancelledError:
+            raise
+        except Exception as e:
+            for abm in methods:
+                abm.fail(e)
+            return
+        if not isinstance(responses, list):
+            #the node rejected the batch as a whole
+            responses = [dict(responses, id=abm.id) for abm in methods]
+        responses = {response.get("id"):response for response in responses}
+        for abm in methods:
+            response = responses.get(abm.id,None)
+            try:
+                if response is None:
+                    raise MissingResponse
+                abm.resolve(response)
+            except Exception as e:
+                abm.fail(e)
+
+    @property
+    def eth(self):
+        return self._eth
+
+    @property
+    def personal(self):
+        return self._personal
 
 
 class W3AIO(object):
-    __slots__=["_canary","_eth","_personal","_filter","_hextools","_abi","_transport","_poller","_types","_structs","_keccak","_solidityKeccak","_contracts","_callable_contracts"]
+    __slots__=["_canary","_eth","_personal","_filter","_hextools","_abi","_transport","_poller","_types","_structs","_keccak","_solidityKeccak","_contracts","_callable_contracts","_singleflight","_cache","_parity","_call_cache","_nonces"]
 
-    def __init__(self, transport, loop=None):
+    def __init__(self, transport, cache=True, call_cache=True, prefetch=8, loop=None):
         self._transport = transport
 
-        self._eth = AttrDict(pipe(self._transport,Eth))
+        self._singleflight = SingleFlight()
+        self._cache = ResponseCache() if cache is True else cache or None
+        self._call_cache = CallCache() if call_cache is True else call_cache or None
+        self._eth = AttrDict(pipe(self._transport,Eth,self._singleflight,self._cache))
         self._personal = AttrDict(pipe(self._transport,Personal))
+        self._parity = AttrDict(pipe(self._transport,Parity,self._singleflight))
+        self._nonces = NonceManager(self._eth)
 
-        self._filter = Filter(self._eth)
-        self._poller = Poller(self._eth, self._filter.on_block)
+        self._filter = Filter(self._eth, self._parity)
+        self._poller = Poller(self._eth, self._on_block, health=getattr(self._transport,"health",None),
+                              prefetch=self._filter.fetch if prefetch else None, window=prefetch or 1)
 
 
         self._types = Types
@@ -58,6 +162,22 @@ class W3AIO(object):
         self._contracts = {}
         self._callable_contracts = AttrDict({})
 
+    async def wait_ready(self, timeout=None):
+        await self._transport.wait_ready(timeout)
+
+    def queue_stats(self):
+        return self._transport.queue_stats()
+
+    def rate_stats(self):
+        return self._transport.rate_stats()
+
+    def metrics(self):
+        return self._transport.metrics()
+
+    def health_stats(self):
+        health = getattr(self._transport,"health",None)
+        return health.stats() if health else None
+
     async def __aenter__(self):
         self.run()
         return self
@@ -76,10 +196,10 @@ class W3AIO(object):
         for task in pending:
             await task.cancel()
 
-    def register_contract(self,abi,name):
-        contract = Structs.abiContract(abi)
+    def register_contract(self,abi,name,address=None):
+        contract = Structs.abiContract(abi,address)
         self._contracts[name] = contract
-        self._callable_contracts[name] = CallableContract(self._eth,self._personal,contract)
+        self._callable_contracts[name] = CallableContract(self._eth,self._personal,contract,self.batch)
 
     def register_event_filter_from_contract(self,contract_name,event_name,filterdictlist,callback):
         contract = self._contracts[contract_name]
@@ -87,6 +207,14 @@ class W3AIO(object):
         event = events[event_name]
         self._filter.set_eventFilter(event,filterdictlist,callback)
 
+    def log_scanner(self, addresses=None, events=None, **kwargs):
+        """
+        A LogScanner over this connection. events may be ABIEvents or
+        (contract name, event name) pairs of registered contracts.
+        """
+        events = [self._contracts[event[0]].events[event[1]] if isinstance(event, tuple) else event for event in events or []]
+        return LogScanner(self._eth, addresses, events, **kwargs)
+
     def register_thash_filter(self,thash,callback):
         self._filter.set_thashFilter(thash,callback)
 
@@ -96,10 +224,35 @@ class W3AIO(object):
     def unregister_address_filter(self,address):
         self._filter.set_addressFilter(address,callback)
 
+    def batch(self):
+        return Batch(self._transport)
+
+    def snapshot(self, block=None):
+        """
+        Pins contract calls made inside it to block, the current head by
+        default, serving repeats from the per block call cache.
+        """
+        return Snapshot(self._eth, self._call_cache, block)
+
+    def transaction_sender(self, private_key, **kwargs):
+        """
+        A TransactionSender signing with private_key. Senders made here
+        share one NonceManager. kwargs are passed to TransactionSender.
+        """
+        return TransactionSender(self._eth, LocalSigner(private_key), self._nonces, **kwargs)
+
+    async def _on_block(self, blocknumber, fetched=None):
+        if self._call_cache:
+            self._call_cache.advance(blocknumber.as_int())
+        await self._filter.on_block(blocknumber, fetched)
+
     async def wait_for_transaction(self, thash, timeout=30):
-        channel = Channel(None)
-        self.register_thash_filter(thash,channel.aio_set_response)
-        return await aio.wait_for(channel.get(),timeout)
+        receipt = aio.get_event_loop().create_future()
+        async def on_receipt(result):
+            if not receipt.done():
+                receipt.set_result(result)
+        self.register_thash_filter(thash,on_receipt)
+        return await aio.wait_for(receipt,timeout)
 
     @property
     def keccak(self):
@@ -125,10 +278,51 @@ class W3AIO(object):
     def eth(self):
         return self._eth
 
+    @property
+    def parity(self):
+        return self._parity
+
+    @property
+    def singleflight(self):
+        return self._singleflight
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def call_cache(self):
+        return self._call_cache
+
+    @property
+    def nonces(self):
+        return self._nonces
+
     @property
     def contracts(self):
         return self._callable_contracts
 
+    async def warm_cache(self, start, stop, transactions=True, receipts=True, concurrency=16):
+        """
+        Fetches blocks start to stop-1, with their transactions and receipts,
+        so the confirmed ones land in the cache and its store.
+        """
+        await self._eth.blockNumber()
+        semaphore = aio.Semaphore(concurrency)
+        async def fetch(call, *args):
+            async with semaphore:
+                return await call(*args)
+        async def warm_block(number):
+            block = await fetch(self._eth.getBlockByNumber,Types.uint256(number))
+            calls = []
+            if transactions:
+                calls += [fetch(self._eth.getTransactionByHash,thash) for thash in block.transactionHashes]
+            if receipts:
+                calls += [fetch(self._eth.getTransactionReceipt,thash) for thash in block.transactionHashes]
+            await aio.gather(*calls)
+        for chunk in range(start, stop, concurrency):
+            await aio.gather(*[warm_block(number) for number in range(chunk, min(chunk + concurrency, stop))])
+
     async def start_poller(self):
         aio.ensure_future(self._poller.run())
 
@@ -1,20 +1,109 @@
+from .solidity_types import (   Address,
+                                Bytes4,
+                                Bytes8,
+                                Bytes16,
+                                Bytes32,
+                                Uint8,
+                                Uint16,
+                                Uint32,
+                                Uint64,
+                                Uint128,
+                                Uint256, )
+
 import json
 from json import JSONEncoder
+from operator import methodcaller
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+    ujson.dumps(object(), default=str)
+except (ImportError, TypeError):
+    #ujson releases before 5 can not encode objects through a default
+    ujson = None
+
+
+"""
+Serializers by exact type. Solidity types encode as their hex string and
+anything with an as_dict, like the structs, is registered on first sight.
+"""
+_serializers = {t:t.as_str for t in [ Address, Bytes4, Bytes8, Bytes16, Bytes32,
+                                        Uint8, Uint16, Uint32, Uint64, Uint128, Uint256, ]}
+
+_as_dict = methodcaller("as_dict")
+
+
+def register(cls, serializer):
+    _serializers[cls] = serializer
+
+
+def default(o):
+    serializer = _serializers.get(type(o),None)
+    if serializer is None:
+        serializer = _as_dict if hasattr(type(o),"as_dict") else str
+        register(type(o),serializer)
+    return serializer(o)
 
 
 class StructEncoder(JSONEncoder):
         def default(self, o):
-            try:
-                return o.as_dict()
-            except:
-                return str(o)
+            return default(o)
+
+
+_encoder = StructEncoder(separators=(',',':'))
+
 
 class w3json(object):
 
     @staticmethod
     def dumps(obj):
-        return json.dumps(obj,cls=StructEncoder)
+        return _encoder.encode(obj)
 
     @staticmethod
     def loads(obj):
         return json.loads(obj)
+
+
+class w3orjson(object):
+
+    @staticmethod
+    def dumps(obj):
+        return orjson.dumps(obj,default=default).decode('utf-8')
+
+    @staticmethod
+    def loads(obj):
+        return orjson.loads(obj)
+
+
+class w3ujson(object):
+
+    @staticmethod
+    def dumps(obj):
+        return ujson.dumps(obj,default=default)
+
+    @staticmethod
+    def loads(obj):
+        return ujson.loads(obj)
+
+
+CODECS = {"json":w3json}
+if ujson:
+    CODECS["ujson"] = w3ujson
+if orjson:
+    CODECS["orjson"] = w3orjson
+
+
+def codec(name=None):
+    """
+    Returns the named codec, or the fastest one installed, to pass as the
+    encoder of a transport.
+    """
+    if name:
+        return CODECS[name]
+    for name in ["orjson","ujson","json"]:
+        if name in CODECS:
+            return CODECS[name]
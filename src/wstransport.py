@@ -1,4 +1,5 @@
-from .channel import Channel
+from .requestqueue import (BLOCK, HIGHPRIORITY, LOWPRIORITY)
+from .transport import (MessageError, Transport)
 
 import asyncio as aio
 import logging
@@ -10,11 +11,6 @@ from websockets.exceptions import *
 log = logging.getLogger(__name__)
 
 
-class MessageError(Exception):
-    """
-    Indicates exception was raised due to a bad message format.
-    """
-
 class ConnectionFailure(Exception):
     """
     This Exception is raised for a failed websocket connection.
@@ -29,6 +25,10 @@ RECONNECT_EXCEPTIONS = [
     'AbortHandshake',
     'NegotiationError',
     'WebSocketProtocolError',
+    'ConnectionFailure',
+    'ConnectionRefusedError',
+    'ConnectionResetError',
+    'TimeoutError',
 ]
 
 
@@ -85,35 +85,25 @@ RAISE_CODES = [
     1015, #"TLS failure [internal]"
 ]
 
-HIGHPRIORITY = 1
-LOWPRIORITY = 2
+class WSTransport(Transport):
+    __slots__ = ["_host","_port","_fail_count","_fail_threshold","_restart","_multiplex"]
 
-class WSTransport(object):
-    __slots__ = ["loop","_host","_port","_request_q","_canary","_encoder","_fail_count","_fail_threshold","_restart"]
-
-    def __init__(self, host, port, fail_threshold = 10, restart=True, encoder=None, loop=None):
-        self.loop = loop or aio.get_event_loop()
+    def __init__(self, host, port, fail_threshold = 10, restart=True, encoder=None, multiplex=False, max_in_flight=100,
+                 batch_window=None, max_batch_size=100, aging=2.0, timeout=None, retries=3, max_queue=0, overflow=BLOCK, rate_limiter=None, metrics=False,
+                 loop=None):
+        super().__init__(encoder=encoder, max_in_flight=max_in_flight, batch_window=batch_window,
+                         max_batch_size=max_batch_size, aging=aging, timeout=timeout, retries=retries,
+                         max_queue=max_queue, overflow=overflow, rate_limiter=rate_limiter, metrics=metrics, loop=loop)
         self._host = host
         self._port = port
-        self._request_q = aio.Queue()
-        self._encoder = encoder
-        self._canary = aio.Event()
         self._fail_count = 0
-        self._fail_threshold = 10
+        self._fail_threshold = fail_threshold
         self._restart = restart
+        self._multiplex = multiplex
 
-    async def close(self):
-        log.debug("Websocket close called")
-        if not self._canary.is_set():
-            self._canary.set()
-        await aio.sleep(1)
-
-    async def call(self, msg):
-        log.debug("Websocket call with message {}".format(msg))
-        channel = Channel(msg)
-        await self._request_q.put(channel)
-        log.debug("Websocket awaiting channel for msg {}".format(msg))
-        return await channel.get()
+    def reset(self):
+        super().reset()
+        self._fail_count = 0
 
     def _decrement_fail_counter(self):
         if self._fail_count > 0:
@@ -122,51 +112,92 @@ class WSTransport(object):
     async def _call(self,ws):
         log.debug("Websocket transport on. Running _call")
         while ws.open:
+            channels = []
             try:
                 self._decrement_fail_counter()
-                channel = None
-                try:
-                    channel = await aio.wait_for(self._request_q.get(),1)
-                except aio.TimeoutError:
-                    pass
-                if channel:
-                    channel = channel
-                    log.debug("Websocket got object from queue")
-                    try:
-                        msg = channel.request
-                        msg = msg if not self._encoder else self._encoder.dumps(msg)
-                    except Exception as e:
-                        raise MessageError
-                    log.debug("Websocket sending message {}".format(msg))
-                    await aio.wait_for(ws.send(msg),15)
-                    msg = await aio.wait_for(ws.recv(),15)
-                    try:
-                        msg = msg if not self._encoder else self._encoder.loads(msg)
-                        log.debug("Websocket decoded recv'd msg as {}".format(msg))
-                    except Exception as e:
-                        raise MessageError
-                    channel.set_response(msg)
-                    log.debug("Websocket set channel msg as {}".format(msg))
+                channel = await self._next()
+                log.debug("Websocket got object from queue")
+                channels = [channel]
+                channels = await self._gather_frame(channel)
+                msg, channels = self._encode_frame(channels)
+                if not channels:
+                    continue
+                log.debug("Websocket sending message {}".format(msg))
+                await aio.wait_for(ws.send(msg),self.IO_TIMEOUT)
+                self._trace_written(channels)
+                msg = await aio.wait_for(ws.recv(),self.IO_TIMEOUT)
+                msg = self._decode(msg)
+                log.debug("Websocket decoded recv'd msg as {}".format(msg))
+                self._dispatch_lockstep(msg, channels)
+                log.debug("Websocket set channel msg as {}".format(msg))
             except MessageError as e:
                 log.debug("Websocket MessageError")
-                channel.set_exception(MessageError)
+                self._message_error()
+                for channel in channels:
+                    channel.set_exception(MessageError)
             except ConnectionClosed as e:
                 if e.code == 1009:
-                    channel.set_exception(ConnectionClosed)
+                    for channel in channels:
+                        channel.set_exception(e)
                 else:
-                    await self._request_q.put(channel)
+                    for channel in channels:
+                        self._retry(channel, e)
                     raise e
-            except Exception as e:
-                await self._request_q.put(channel)
+            except (Exception, aio.CancelledError) as e:
+                for channel in channels:
+                    self._retry(channel, e)
                 raise e
 
-    async def _monitor(self, tasks):
-        self._fail_count = 0
-        done, pending = await aio.wait(
-        tasks,return_when=aio.FIRST_COMPLETED,)
-        for task in pending:
-            task.cancel()
-        raise ConnectionFailure
+    async def _writer(self, ws):
+        log.debug("Websocket transport on. Running _writer")
+        while ws.open:
+            await self._in_flight_sem.acquire()
+            msg, channels = await self._next_frame()
+            self._register_in_flight(channels)
+            if not channels:
+                continue
+            log.debug("Websocket sending message {}".format(msg))
+            try:
+                await aio.wait_for(ws.send(msg),self.IO_TIMEOUT)
+                self._trace_written(channels)
+            except ConnectionClosed as e:
+                if e.code != 1009:
+                    raise e
+                self._fail_message_too_big(channels, e)
+                return
+
+    def _fail_message_too_big(self, channels, exception):
+        """
+        A 1009 close fails the requests it hit rather than resending them,
+        since they would only trip it again, and the connection is reopened.
+        """
+        log.debug("Websocket message too big, failing {} requests".format(len(channels)))
+        for channel in channels:
+            self._pop_in_flight(channel)
+            channel.set_exception(exception)
+
+    async def _reader(self, ws):
+        log.debug("Websocket transport on. Running _reader")
+        while ws.open:
+            self._decrement_fail_counter()
+            try:
+                msg = await ws.recv()
+            except ConnectionClosed as e:
+                if e.code != 1009:
+                    raise e
+                #the reply that was too big can not be told apart, so all in flight fail
+                self._fail_message_too_big(list({id(c):c for c in self._in_flight.values()}.values()), e)
+                return
+            try:
+                msg = self._decode(msg)
+                log.debug("Websocket decoded recv'd msg as {}".format(msg))
+            except MessageError as e:
+                log.error("Websocket could not decode recv'd msg {}".format(msg))
+                self._message_error()
+                continue
+            for _ in range(self._dispatch_in_flight(msg)):
+                self._in_flight_sem.release()
+            log.debug("Websocket set channel msg as {}".format(msg))
 
     async def run(self):
         if self._restart:
@@ -177,23 +208,34 @@ class WSTransport(object):
     async def _run_with_restart(self):
         while not self._canary.is_set():
             await self._handle()
+            if not self._canary.is_set():
+                await self._wait_backoff(self._fail_count)
 
     async def _run_without_restart(self):
         await self._handle()
 
     async def _handle(self):
         log.debug('WS run called')
-        await aio.sleep(1)
-        async with websockets.connect('ws://{}:{}'.format(self._host,self._port)) as ws:
-            call_task = self._call(ws)
-            close_task = self._canary.wait()
-            log.debug('WS _canary created')
-            try:
-                await self._monitor([call_task,close_task])
-            except Exception as e:
-                log.debug('WS connection lost')
-                self._fail_count += 1
-                await self._exception_handler(e)
+        try:
+            async with websockets.connect('ws://{}:{}'.format(self._host,self._port)) as ws:
+                if self._multiplex:
+                    self._in_flight_sem = aio.Semaphore(self._max_in_flight)
+                    tasks = [self._writer(ws),self._reader(ws)]
+                else:
+                    tasks = [self._call(ws)]
+                self._connected()
+                log.debug('WS connected')
+                try:
+                    await self._race(ws.wait_closed(),*tasks)
+                finally:
+                    self._ready.clear()
+                    self._requeue_in_flight()
+                if not self._canary.is_set():
+                    raise ConnectionFailure
+        except Exception as e:
+            log.debug('WS connection lost')
+            self._fail_count += 1
+            await self._exception_handler(e)
 
     async def _exception_handler(self, exception):
         log.debug("Websocket exception {}".format(exception))
@@ -205,10 +247,10 @@ class WSTransport(object):
             raise exception
         elif exception.__class__.__name__ in RECONNECT_EXCEPTIONS:
             log.error('Suppressed exception {}. Reconnecting.'.format(str(exception)))
-        elif exception.__class__.__name__ in BASED_ON_CODE:
+        elif isinstance(exception, ConnectionClosed):
             if exception.code in RAISE_CODES:
                 raise exception
-            elif exception.__class__.__name__ in RECONNECT_CODES:
+            elif exception.code in RECONNECT_CODES:
                 log.error('Suppressed exception {}. Reconnecting.'.format(str(exception)))
             else: #unknown case
                 await self.close()
@@ -0,0 +1,256 @@
+"""
+Exercises the HTTP and IPC transports against stand in servers on local
+sockets. Run from the repository root:
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.httptransport import HTTPTransport
+from src.ipctransport import IPCTransport
+
+import asyncio as aio
+import json
+import tempfile
+import unittest
+
+
+def request(request_id, method="eth_blockNumber"):
+    return {"jsonrpc":"2.0","method":method,"params":[],"id":request_id}
+
+
+def reply(msg):
+    if isinstance(msg, list):
+        return [reply(m) for m in msg]
+    return {"jsonrpc":"2.0","id":msg["id"],"result":hex(msg["id"])}
+
+
+class LocalServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = aio.new_event_loop()
+        aio.set_event_loop(self.loop)
+        self.connections = 0
+        self.servers = []
+        self.transports = []
+
+    def tearDown(self):
+        for transport, task in self.transports:
+            self.wait(transport.close())
+            task.cancel()
+        for server in self.servers:
+            server.close()
+            self.wait(server.wait_closed())
+        self.loop.run_until_complete(aio.sleep(0))
+        self.loop.close()
+
+    def wait(self, coro, timeout=5):
+        return self.loop.run_until_complete(aio.wait_for(coro, timeout))
+
+    def start(self, transport):
+        self.transports.append((transport, aio.ensure_future(transport.run())))
+        return transport
+
+
+class HTTPTransportTest(LocalServerTest):
+
+    def serve(self, respond):
+        """
+        A keep-alive HTTP/1.1 server answering each POST with
+        respond(writer, body).
+        """
+        async def handler(reader, writer):
+            self.connections += 1
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers["content-length"]))
+                respond(writer, body)
+                await writer.drain()
+            writer.close()
+        server = self.wait(aio.start_server(handler, '127.0.0.1', 0))
+        self.servers.append(server)
+        return server.sockets[0].getsockname()[1]
+
+    def test_keep_alive_round_trips(self):
+        def respond(writer, body):
+            payload = json.dumps(reply(json.loads(body))).encode()
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                         + 'Content-Length: {}\r\n\r\n'.format(len(payload)).encode() + payload)
+        port = self.serve(respond)
+        transport = self.start(HTTPTransport('127.0.0.1', port, size=1, encoder=json))
+        for request_id in range(1, 4):
+            response = self.wait(transport.call(request(request_id)))
+            self.assertEqual(response["result"], hex(request_id))
+        self.assertEqual(self.connections, 1)
+
+    def test_chunked_reply(self):
+        def respond(writer, body):
+            payload = json.dumps(reply(json.loads(body))).encode()
+            half = len(payload) // 2
+            writer.write(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n')
+            writer.write('{:x};ext=1\r\n'.format(half).encode() + payload[:half] + b'\r\n')
+            writer.write('{:x}\r\n'.format(len(payload) - half).encode() + payload[half:] + b'\r\n')
+            writer.write(b'0\r\nX-Trailer: 1\r\n\r\n')
+        port = self.serve(respond)
+        transport = self.start(HTTPTransport('127.0.0.1', port, size=1, encoder=json))
+        for request_id in (7, 8):
+            response = self.wait(transport.call(request(request_id)))
+            self.assertEqual(response["result"], hex(request_id))
+        self.assertEqual(self.connections, 1)
+
+    def test_error_status_without_jsonrpc_body(self):
+        def respond(writer, body):
+            writer.write(b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 4\r\n\r\nbusy')
+        port = self.serve(respond)
+        transport = self.start(HTTPTransport('127.0.0.1', port, size=1, encoder=json))
+        with self.assertRaises(Exception) as raised:
+            self.wait(transport.call(request(1)))
+        self.assertEqual(getattr(raised.exception, "status", None), 503)
+
+    def test_clean_start_counts_no_reconnects(self):
+        def respond(writer, body):
+            payload = json.dumps(reply(json.loads(body))).encode()
+            writer.write('HTTP/1.1 200 OK\r\nContent-Length: {}\r\n\r\n'.format(len(payload)).encode() + payload)
+        port = self.serve(respond)
+        transport = self.start(HTTPTransport('127.0.0.1', port, size=4, encoder=json, metrics=True))
+        self.wait(aio.gather(*[transport.call(request(request_id)) for request_id in range(1, 9)]))
+        self.assertEqual(transport.metrics()["reconnects"], 0)
+
+
+class IPCTransportTest(LocalServerTest):
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(tempfile.mkdtemp(), 'node.ipc')
+
+    def serve(self, handle):
+        async def handler(reader, writer):
+            self.connections += 1
+            await handle(self.connections, reader, writer)
+            writer.close()
+        server = self.wait(aio.start_unix_server(handler, self.path))
+        self.servers.append(server)
+
+    def test_replies_routed_by_id(self):
+        async def handle(connection, reader, writer):
+            #answer every pair of requests in reverse order
+            held = []
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                held.append(json.loads(line))
+                if len(held) == 2:
+                    for msg in reversed(held):
+                        writer.write(json.dumps(reply(msg)).encode() + b'\n')
+                    held = []
+                    await writer.drain()
+        self.serve(handle)
+        transport = self.start(IPCTransport(self.path, encoder=json))
+        responses = self.wait(aio.gather(transport.call(request(1)), transport.call(request(2))))
+        self.assertEqual([response["result"] for response in responses], ['0x1', '0x2'])
+
+    def test_multi_line_and_malformed_replies(self):
+        async def handle(connection, reader, writer):
+            line = await reader.readline()
+            writer.write(b'{"jsonrpc":"2.0",\n"id":1,\n"result":"0x1"}\n')
+            line = await reader.readline()
+            writer.write(b'{"jsonrpc": truncated\n')
+            writer.write(json.dumps(reply(json.loads(line))).encode() + b'\n')
+            line = await reader.readline()
+            writer.write(json.dumps(reply(json.loads(line))).encode() + b'\n')
+            await writer.drain()
+            await reader.readline()
+        self.serve(handle)
+        transport = self.start(IPCTransport(self.path, encoder=json))
+        self.assertEqual(self.wait(transport.call(request(1)))["result"], '0x1')
+        self.assertEqual(self.wait(transport.call(request(2)))["result"], '0x2')
+        self.assertEqual(self.wait(transport.call(request(3)))["result"], '0x3')
+
+    def test_error_without_id_answers_frame_sent(self):
+        async def handle(connection, reader, writer):
+            line = await reader.readline()
+            writer.write(b'{"jsonrpc":"2.0","id":null,"error":{"code":-32700,"message":"parse error"}}\n')
+            line = await reader.readline()
+            writer.write(json.dumps(reply(json.loads(line))).encode() + b'\n')
+            await writer.drain()
+            await reader.readline()
+        self.serve(handle)
+        transport = self.start(IPCTransport(self.path, encoder=json, max_in_flight=1))
+        self.assertEqual(self.wait(transport.call(request(1)))["error"]["code"], -32700)
+        #the permit came back, so the next request is sent
+        self.assertEqual(self.wait(transport.call(request(2)))["result"], '0x2')
+        self.assertEqual(transport.queue_stats()["in_flight"], 0)
+
+    def test_reconnect_requeues_in_flight(self):
+        async def handle(connection, reader, writer):
+            if connection == 1:
+                #drop the first connection without answering
+                await reader.readline()
+                return
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                writer.write(json.dumps(reply(json.loads(line))).encode() + b'\n')
+                await writer.drain()
+        self.serve(handle)
+        transport = self.start(IPCTransport(self.path, encoder=json))
+        self.assertEqual(self.wait(transport.call(request(5)))["result"], '0x5')
+        self.assertEqual(self.connections, 2)
+
+    def test_drop_after_connect_restarts_backoff(self):
+        class RecordingIPCTransport(IPCTransport):
+            __slots__ = ["backoffs"]
+            async def _wait_backoff(self, failures):
+                self.backoffs.append(failures)
+                await super()._wait_backoff(failures)
+        async def handle(connection, reader, writer):
+            if connection <= 3:
+                await reader.readline()
+                return
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                writer.write(json.dumps(reply(json.loads(line))).encode() + b'\n')
+                await writer.drain()
+        self.serve(handle)
+        transport = RecordingIPCTransport(self.path, encoder=json)
+        transport.backoffs = []
+        self.start(transport)
+        self.assertEqual(self.wait(transport.call(request(4)))["result"], '0x4')
+        self.assertEqual(transport.backoffs, [1, 1, 1])
+
+    def test_reconnect_requeues_batch_window(self):
+        async def handle(connection, reader, writer):
+            if connection == 1:
+                #drop the first connection while the writer is gathering a frame
+                await aio.sleep(0.1)
+                return
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                writer.write(json.dumps(reply(json.loads(line))).encode() + b'\n')
+                await writer.drain()
+        self.serve(handle)
+        transport = self.start(IPCTransport(self.path, encoder=json, batch_window=0.5))
+        self.wait(aio.sleep(0.05))
+        self.assertEqual(self.wait(transport.call(request(6)))["result"], '0x6')
+        self.assertEqual(self.connections, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+"""
+Exercises NonceManager and TransactionSender against a stand in node.
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exceptions import JsonRPCError
+from src.nonces import NonceManager
+from src.transport import RequestFailed
+from src.txsender import TransactionSender
+
+import asyncio as aio
+import unittest
+
+
+SENDER = "0x" + "11" * 20
+TO = "0x" + "22" * 20
+
+
+class Quantity(object):
+
+    def __init__(self, value):
+        self.value = value
+
+    def as_int(self):
+        return self.value
+
+
+class Error(object):
+
+    def __init__(self, message):
+        self.code = -32000
+        self.message = message
+
+
+class Node(object):
+    """
+    Answers the calls TransactionSender makes. fail maps a method name to
+    an exception, or a callable making one, raised in place of a reply.
+    """
+
+    def __init__(self, count=0):
+        self.count = count
+        self.fail = {}
+
+    async def _reply(self, method, value):
+        failure = self.fail.get(method, None)
+        if callable(failure):
+            failure = failure()
+        if failure is not None:
+            raise failure
+        return value
+
+    async def getTransactionCount(self, address, block):
+        return Quantity(self.count)
+
+    async def chainId(self):
+        return await self._reply("chainId", Quantity(1))
+
+    async def gasPrice(self):
+        return await self._reply("gasPrice", Quantity(1))
+
+    async def estimateGas(self, **kwargs):
+        return await self._reply("estimateGas", Quantity(21000))
+
+    async def sendRawTransaction(self, raw):
+        return await self._reply("sendRawTransaction", raw)
+
+
+class Signer(object):
+
+    address = SENDER
+
+    def sign(self, transaction):
+        raw = "0x{:x}".format(transaction["nonce"])
+        return raw, raw
+
+
+class NonceManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = aio.new_event_loop()
+        aio.set_event_loop(self.loop)
+        self.node = Node(count=5)
+        self.nonces = NonceManager(self.node)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def wait(self, coro, timeout=5):
+        return self.loop.run_until_complete(aio.wait_for(coro, timeout))
+
+    def test_release_newest_rolls_back(self):
+        nonce = self.wait(self.nonces.acquire(SENDER))
+        self.nonces.release(SENDER, nonce)
+        self.assertEqual(self.wait(self.nonces.acquire(SENDER)), nonce)
+
+    def test_release_out_of_order_is_reused(self):
+        first = self.wait(self.nonces.acquire(SENDER))
+        second = self.wait(self.nonces.acquire(SENDER))
+        self.nonces.release(SENDER, first)
+        self.nonces.confirm(SENDER, second)
+        self.assertEqual(self.wait(self.nonces.acquire(SENDER)), first)
+        self.assertEqual(self.wait(self.nonces.acquire(SENDER)), second + 1)
+
+    def test_forget_rereads_without_going_back(self):
+        first = self.wait(self.nonces.acquire(SENDER))
+        second = self.wait(self.nonces.acquire(SENDER))
+        self.nonces.forget(SENDER, first)
+        #the node has not pooled either yet, second is still in flight
+        self.assertEqual(self.wait(self.nonces.acquire(SENDER)), second + 1)
+        self.assertEqual(self.nonces.stats()["reconciles"], 2)
+
+
+class TransactionSenderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = aio.new_event_loop()
+        aio.set_event_loop(self.loop)
+        self.node = Node(count=3)
+        self.sender = TransactionSender(self.node, Signer(), resends=1)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def wait(self, coro, timeout=5):
+        return self.loop.run_until_complete(aio.wait_for(coro, timeout))
+
+    def in_flight(self):
+        return self.sender.stats()["nonces"]["senders"][SENDER]["in_flight"]
+
+    def test_send_confirms_nonce(self):
+        self.assertEqual(self.wait(self.sender.send(to=TO)), "0x3")
+        self.assertEqual(self.wait(self.sender.send(to=TO)), "0x4")
+        self.assertEqual(self.in_flight(), 0)
+
+    def test_failure_before_submit_releases(self):
+        for method in ("chainId", "gasPrice", "estimateGas"):
+            self.node.fail = {method: RequestFailed()}
+            with self.assertRaises(RequestFailed):
+                self.wait(self.sender.send(to=TO))
+            self.assertEqual(self.in_flight(), 0)
+        self.node.fail = {}
+        self.assertEqual(self.wait(self.sender.send(to=TO)), "0x3")
+        self.assertEqual(self.sender.stats()["nonces"]["reconciles"], 1)
+
+    def test_cancel_before_submit_releases(self):
+        started = aio.Event()
+        async def chain_id():
+            started.set()
+            await aio.sleep(10)
+        self.node.chainId = chain_id
+        task = self.loop.create_task(self.sender.send(to=TO))
+        self.wait(started.wait())
+        task.cancel()
+        with self.assertRaises(aio.CancelledError):
+            self.loop.run_until_complete(task)
+        self.assertEqual(self.in_flight(), 0)
+        del self.node.chainId
+        self.assertEqual(self.wait(self.sender.send(to=TO)), "0x3")
+
+    def test_unknown_outcome_forgets(self):
+        self.node.fail = {"sendRawTransaction": RequestFailed()}
+        with self.assertRaises(RequestFailed):
+            self.wait(self.sender.send(to=TO))
+        self.assertEqual(self.in_flight(), 0)
+        #the node took it after all
+        self.node.count = 4
+        self.node.fail = {}
+        self.assertEqual(self.wait(self.sender.send(to=TO)), "0x4")
+
+    def test_refused_releases(self):
+        self.node.fail = {"sendRawTransaction": lambda: JsonRPCError(Error("insufficient funds"))}
+        with self.assertRaises(JsonRPCError):
+            self.wait(self.sender.send(to=TO))
+        self.node.fail = {}
+        self.assertEqual(self.wait(self.sender.send(to=TO)), "0x3")
+        self.assertEqual(self.sender.stats()["nonces"]["reconciles"], 1)
+
+    def test_nonce_too_low_resigns(self):
+        def used():
+            #another process sent with this nonce first
+            self.node.fail = {}
+            self.node.count = 4
+            return JsonRPCError(Error("nonce too low"))
+        self.node.fail = {"sendRawTransaction": used}
+        self.assertEqual(self.wait(self.sender.send(to=TO)), "0x4")
+        self.assertEqual(self.sender.stats()["nonce_low"], 1)
+        self.assertEqual(self.in_flight(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()